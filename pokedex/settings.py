@@ -88,6 +88,34 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Cache alias and timeout (in seconds) used for API response caching
+POKEDEX_CACHE_ALIAS = 'default'
+POKEDEX_CACHE_TIMEOUT = 300
+
+# Name search backend: 'memory' (in-process index) or 'trigram' (pg_trgm)
+POKEDEX_SEARCH_BACKEND = 'memory'
+
+# Match learns_move filters against in-memory learnset bitmaps instead of
+# semi-joins on the learnset table
+POKEDEX_LEARNSET_BITMAPS = False
+
+# How long clients and proxies may cache autocomplete responses (in seconds)
+POKEDEX_AUTOCOMPLETE_MAX_AGE = 3600
+
+# Team optimizer: candidate pools of at least POKEDEX_TEAM_PARALLEL_POOL
+# Pokemon are searched by POKEDEX_TEAM_WORKERS processes (None for one per CPU)
+POKEDEX_TEAM_PARALLEL_POOL = 5000
+POKEDEX_TEAM_WORKERS = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -0,0 +1,177 @@
+"""
+Response caching for the read endpoints.
+
+Cached responses are keyed on a global data version which is bumped whenever
+a Pokemon, Move or learnset changes (see signals.py), so stale entries are
+never served and simply age out of the cache backend. The version is kept in
+the DataVersion table rather than the cache, so writes made by other workers
+and by the load scripts and management commands are seen by every process,
+even with a per-process cache backend.
+
+Detail and learnset responses are cached per object instead, keyed on the
+object's `updated_at`, which for a Pokemon is also touched whenever its
+learnset or one of its moves changes. Edits elsewhere in the Pokedex leave
+them cached, and they are keyed on the same column as the conditional GET
+validators, so a validator never matches a stale body.
+
+In-process indexes derived from the data are held in a VersionedIndex and
+rebuilt on first use after the data version changes.
+"""
+
+import functools
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from django.db.models import F
+
+from .models import DataVersion
+
+DATA_VERSION_PK = 1
+
+def get_cache():
+    return caches[getattr(settings, 'POKEDEX_CACHE_ALIAS', 'default')]
+
+def initial_data_version():
+    # A timestamp in microseconds, so a recreated counter never goes back to
+    # versions that cached entries may still be keyed on
+    return time.time_ns() // 1000
+
+def get_data_version(request=None):
+    """
+    Returns the current data version, initialising it if necessary. When a
+    request is given, the version is read once and reused for the rest of
+    the request.
+    """
+    if request is not None:
+        version = getattr(request, '_pokedex_data_version', None)
+        if version is None:
+            version = request._pokedex_data_version = get_data_version()
+        return version
+
+    version = DataVersion.objects.filter(pk=DATA_VERSION_PK).values_list('version', flat=True).first()
+    if version is None:
+        row, _ = DataVersion.objects.get_or_create(
+            pk=DATA_VERSION_PK, defaults={'version': initial_data_version()}
+        )
+        version = row.version
+    return version
+
+def bump_data_version():
+    """
+    Invalidates every cached response by moving to a new data version.
+    """
+    updated = DataVersion.objects.filter(pk=DATA_VERSION_PK).update(version=F('version') + 1)
+    if not updated:
+        get_data_version()
+
+class VersionedIndex:
+    """
+    Holds an index created by build(version), rebuilding it the first time
+    it is used after the data version changes.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.index = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        version = get_data_version()
+        index = self.index
+        if index is None or index.version != version:
+            with self.lock:
+                index = self.index
+                if index is None or index.version != version:
+                    index = self.index = self.build(version)
+        return index
+
+def normalize_query_params(request):
+    """
+    Returns the non-empty query parameters of a request sorted by name, so
+    equivalent URLs normalize to the same value.
+    """
+    params = sorted(
+        (key, [value for value in request.query_params.getlist(key) if value])
+        for key in request.query_params
+    )
+    return [(key, values) for key, values in params if values]
+
+def make_response_cache_key(request):
+    """
+    Builds a cache key from the request path and its normalized query
+    parameters, so equivalent URLs share a cache entry.
+    """
+    raw = f'{request.get_host()}{request.path}?{normalize_query_params(request)!r}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'pokemon:response:{get_data_version(request)}:{digest}'
+
+def cache_response(view_method):
+    """
+    Caches the data of successful responses returned by a viewset action.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = make_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = getattr(settings, 'POKEDEX_CACHE_TIMEOUT', 300)
+            cache.set(key, response.data, timeout)
+        return response
+
+    return wrapper
+
+def get_updated_at(request, model, pk):
+    """
+    Returns the `updated_at` of the object with the given primary key, or
+    None when it does not exist. Read once per request, and shared by the
+    conditional GET validators and the object response cache.
+    """
+    cached = getattr(request, '_pokedex_updated_at', None)
+    if cached is None:
+        cached = request._pokedex_updated_at = {}
+    key = (model._meta.label, str(pk))
+    if key not in cached:
+        try:
+            cached[key] = model._default_manager.filter(pk=pk).values_list('updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            cached[key] = None
+    return cached[key]
+
+def cache_object_response(view_method):
+    """
+    Caches the data of successful responses of a detail action, keyed on
+    the object's last modification time rather than the data version.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        model = self.queryset.model
+        pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        updated_at = get_updated_at(request, model, pk)
+        if updated_at is None:
+            return view_method(self, request, *args, **kwargs)
+
+        cache = get_cache()
+        raw = f'{request.get_host()}{request.path}?{normalize_query_params(request)!r}'
+        digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+        key = f'pokemon:object:{model._meta.label_lower}:{pk}:{updated_at.timestamp()}:{digest}'
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = getattr(settings, 'POKEDEX_CACHE_TIMEOUT', 300)
+            cache.set(key, response.data, timeout)
+        return response
+
+    return wrapper
@@ -0,0 +1,77 @@
+"""
+Conditional GET support (ETag / Last-Modified) for the read endpoints.
+
+Detail validators are derived from the object's `updated_at` column, so a
+matching request is answered with 304 Not Modified after a single indexed
+lookup, before the response cache or any serialization is touched. List
+validators are derived from the data version (see cache.py) and the query
+string, which costs a single lookup shared with the response cache.
+"""
+
+import functools
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_data_version, get_updated_at, normalize_query_params
+
+def get_validators(view, request, pk=None):
+    """
+    Returns an (etag, last_modified) pair for the object with the given
+    primary key, or for the list when no key is given. Lists have no
+    last_modified.
+
+    Returns (None, None) when the object does not exist.
+    """
+    # Look objects up by key alone: query parameters of nested actions
+    # (e.g. a Pokemon's moves) are not filters on the object itself
+    model = view.queryset.model
+    if pk is not None:
+        updated_at = get_updated_at(request, model, pk)
+        if updated_at is None:
+            return None, None
+        state = f'{pk}:{updated_at.isoformat()}'
+    else:
+        updated_at = None
+        state = f'list:{get_data_version(request)}'
+
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = ':'.join([
+        model._meta.label,
+        request.path,
+        state,
+        repr(normalize_query_params(request)),
+        renderer.format if renderer else '',
+    ])
+    etag = quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+    last_modified = int(updated_at.timestamp()) if updated_at else None
+    return etag, last_modified
+
+def conditional_response(view_method):
+    """
+    Adds ETag and Last-Modified headers to a viewset action and answers
+    matching conditional requests with 304 Not Modified.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        etag, last_modified = get_validators(self, request, pk)
+        if etag is None:
+            return view_method(self, request, *args, **kwargs)
+
+        not_modified = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    return wrapper
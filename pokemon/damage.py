@@ -0,0 +1,154 @@
+"""
+Batched damage calculation over attacker x defender x move grids.
+
+Damage follows the main series formula without critical hits or other
+modifiers:
+
+    ((2 * level / 5 + 2) * power * attack / defense / 50 + 2) * STAB * effectiveness
+
+where attack and defense are the physical or special stats depending on the
+move's category, STAB is 1.5 when the move shares a type with the attacker
+and effectiveness comes from the type chart. Status moves and moves without
+power deal no damage. Damage is the highest roll, rounded down; the expected
+damage instead averages the 0.85-1.0 random roll and weights it by accuracy.
+
+Every input is turned into NumPy arrays once and whole grids are evaluated
+with broadcasting, in chunks of attackers so large grids can be streamed.
+"""
+
+import numpy as np
+
+from .models import Move, Pokemon
+from .typechart import DEFENSIVE, NO_TYPE, type_index
+
+DEFAULT_LEVEL = 50
+STAB = 1.5
+MEAN_ROLL = 0.925
+
+class Combatants:
+    """
+    Stats and type indexes of a list of Pokemon, as arrays in list order.
+    """
+    FIELDS = ['id', 'type_1', 'type_2', 'attack', 'defense', 'sp_atk', 'sp_def']
+    ARRAYS = ['type_1', 'type_2', 'attack', 'defense', 'sp_atk', 'sp_def']
+
+    def __init__(self, ids, **arrays):
+        self.ids = ids
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def from_rows(cls, rows):
+        rows = list(rows)
+        type_1 = np.array([type_index(row['type_1']) for row in rows], dtype=np.intp)
+        type_2 = np.array([type_index(row['type_2']) for row in rows], dtype=np.intp)
+        type_2[type_2 == type_1] = NO_TYPE
+        stats = {
+            field: np.array([row[field] for row in rows], dtype=np.float64)
+            for field in ('attack', 'defense', 'sp_atk', 'sp_def')
+        }
+        return cls([row['id'] for row in rows], type_1=type_1, type_2=type_2, **stats)
+
+    def slice(self, start, stop):
+        return Combatants(
+            self.ids[start:stop],
+            **{name: getattr(self, name)[start:stop] for name in self.ARRAYS},
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+class MoveSet:
+    """
+    Power, category, type and accuracy of a list of moves, as arrays in list
+    order.
+    """
+    FIELDS = ['id', 'type', 'power', 'category', 'accuracy']
+
+    def __init__(self, rows):
+        rows = list(rows)
+        self.ids = [row['id'] for row in rows]
+        self.type = np.array([type_index(row['type']) for row in rows], dtype=np.intp)
+        self.power = np.array([
+            row['power'] if row['power'] and row['category'] != 'status' else 0 for row in rows
+        ], dtype=np.float64)
+        self.physical = np.array([row['category'] == 'physical' for row in rows], dtype=bool)
+        # Moves without an accuracy never miss
+        self.accuracy = np.array([
+            row['accuracy'] / 100 if row['accuracy'] is not None else 1.0 for row in rows
+        ], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.ids)
+
+def load_rows(model, fields, ids):
+    """
+    Returns the rows for ids in the given order, repeating duplicates, and
+    the ids that do not exist.
+    """
+    rows = {row['id']: row for row in model.objects.filter(id__in=set(ids)).values(*fields)}
+    return [rows[pk] for pk in ids if pk in rows], [pk for pk in ids if pk not in rows]
+
+def load_grid(attacker_ids, defender_ids, move_ids):
+    """
+    Loads the arrays for a damage grid with three queries.
+
+    Returns (attackers, defenders, moves, missing), where missing maps
+    'attackers', 'defenders' and 'moves' to the ids that were not found.
+    """
+    pokemon_ids = list(dict.fromkeys(list(attacker_ids) + list(defender_ids)))
+    pokemon, _ = load_rows(Pokemon, Combatants.FIELDS, pokemon_ids)
+    pokemon = {row['id']: row for row in pokemon}
+    moves, missing_moves = load_rows(Move, MoveSet.FIELDS, move_ids)
+
+    missing = {
+        'attackers': [pk for pk in attacker_ids if pk not in pokemon],
+        'defenders': [pk for pk in defender_ids if pk not in pokemon],
+        'moves': missing_moves,
+    }
+    attackers = Combatants.from_rows(pokemon[pk] for pk in attacker_ids if pk in pokemon)
+    defenders = Combatants.from_rows(pokemon[pk] for pk in defender_ids if pk in pokemon)
+    return attackers, defenders, MoveSet(moves), missing
+
+def damage_grid(attackers, defenders, moves, level=DEFAULT_LEVEL, expected=False):
+    """
+    Returns an (attackers, defenders, moves) array of damage values.
+    """
+    # Moves of a type missing from the chart get no STAB and are neutral
+    # against everything, even though NO_TYPE also marks a missing type_2
+    known = moves.type < NO_TYPE
+    # (A, M): the attacking stat used by each move and its STAB
+    attack = np.where(moves.physical, attackers.attack[:, None], attackers.sp_atk[:, None])
+    stab = np.where(
+        known & ((moves.type == attackers.type_1[:, None]) | (moves.type == attackers.type_2[:, None])),
+        STAB, 1.0,
+    )
+    # (D, M): the defending stat hit by each move and its effectiveness
+    defense = np.where(moves.physical, defenders.defense[:, None], defenders.sp_def[:, None])
+    defense = np.maximum(defense, 1)
+    effectiveness = np.where(
+        known,
+        DEFENSIVE[np.where(known, moves.type, 0), defenders.type_1[:, None], defenders.type_2[:, None]],
+        1.0,
+    )
+
+    base = (2 * level // 5 + 2) * moves.power
+    damage = (base * attack[:, None, :] / defense[None, :, :]) / 50 + 2
+    damage *= (stab * moves.power.astype(bool))[:, None, :]
+    damage *= effectiveness[None, :, :]
+
+    if expected:
+        return damage * (MEAN_ROLL * moves.accuracy)
+    return np.floor(damage)
+
+def iter_damage_chunks(attackers, defenders, moves, level=DEFAULT_LEVEL, expected=False,
+                       max_cells=1_000_000):
+    """
+    Yields (start, grid) pairs covering the attackers in slices small enough
+    for each grid to hold at most max_cells values.
+    """
+    per_attacker = max(len(defenders) * len(moves), 1)
+    step = max(max_cells // per_attacker, 1)
+    for start in range(0, len(attackers), step):
+        chunk = attackers.slice(start, start + step)
+        yield start, damage_grid(chunk, defenders, moves, level, expected)
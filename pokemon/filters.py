@@ -0,0 +1,82 @@
+import django_filters
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+
+from .learnsets import filter_learnsets
+from .models import DERIVED_STAT_FIELDS, STAT_FIELDS, Move, Pokemon
+
+RANGE_LOOKUPS = ['exact', 'gte', 'lte', 'in']
+
+class LearnsMoveFilterBackend(BaseFilterBackend):
+    """
+    Filters Pokemon by the moves they learn, e.g. `?learns_move=52,89`.
+
+    Matches Pokemon that learn any of the moves by default, or all of them
+    with `?learns_move_match=all`. `?learns_move_exclude=` leaves out the
+    Pokemon that learn any of its moves. See learnsets.filter_learnsets()
+    for how they are evaluated.
+    """
+    query_param = 'learns_move'
+    match_query_param = 'learns_move_match'
+    exclude_query_param = 'learns_move_exclude'
+
+    def parse_move_ids(self, request, name):
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        return {int(item) for item in value.split(',') if item.strip().isdigit()}
+
+    def filter_queryset(self, request, queryset, view):
+        move_ids = self.parse_move_ids(request, self.query_param)
+        excluded = self.parse_move_ids(request, self.exclude_query_param)
+        if move_ids is None and excluded is None:
+            return queryset
+        if move_ids is not None and not move_ids:
+            return queryset.none()
+
+        match_all = request.query_params.get(self.match_query_param) == 'all'
+        return filter_learnsets(
+            queryset,
+            all_of=move_ids if match_all else (),
+            any_of=move_ids if move_ids and not match_all else (),
+            none_of=excluded or (),
+        )
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    pass
+
+class PokemonFilterSet(django_filters.FilterSet):
+    """
+    Exact, range and comma-separated `in` filters on the Pokemon types and
+    stats, e.g. `?speed__gte=100&attack__gte=80&attack__lte=120`.
+
+    `type` matches Pokemon with any of the given types as either their
+    primary or secondary type. The derived stat columns (base stat total,
+    bulk and BMI) are filterable the same way as the stats.
+    """
+    type = CharInFilter(method='filter_either_type')
+
+    class Meta:
+        model = Pokemon
+        fields = {
+            'type_1': ['exact', 'in'],
+            'type_2': ['exact', 'in', 'isnull'],
+            **{field: RANGE_LOOKUPS for field in STAT_FIELDS + DERIVED_STAT_FIELDS},
+        }
+
+    def filter_either_type(self, queryset, name, value):
+        return queryset.filter(Q(type_1__in=value) | Q(type_2__in=value))
+
+class MoveFilterSet(django_filters.FilterSet):
+    """
+    Exact and comma-separated `in` filters on the move type and category,
+    and range filters on `power` and `accuracy`, e.g. `?power__gte=90`.
+    """
+    class Meta:
+        model = Move
+        fields = {
+            'type': ['exact', 'in'],
+            'category': ['exact', 'in'],
+            'power': RANGE_LOOKUPS + ['isnull'],
+            'accuracy': RANGE_LOOKUPS + ['isnull'],
+        }
@@ -0,0 +1,116 @@
+"""
+Relevance-ranked full-text search over move descriptions and effects.
+
+On Postgres, migration 0009 adds a generated `search_vector` tsvector column
+to the move table, weighting the description above the effect, with a GIN
+index. Postgres keeps it up to date on every insert and update, including
+the bulk loaders and COPY imports, and ranks matches with ts_rank().
+
+Other databases use an in-process inverted index with the same field
+weights, rebuilt whenever the data version changes. It only lowercases and
+strips plural "s" endings rather than stemming like Postgres' `english`
+configuration, so results can differ slightly between the two.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .cache import VersionedIndex
+from .models import Move
+
+SEARCH_CONFIG = 'english'
+
+# ts_rank()'s default weights for the A (description) and B (effect) labels
+FIELD_WEIGHTS = {'description': 1.0, 'effect': 0.4}
+
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has in is it its of on or that the this to was '
+    'will with'.split()
+)
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+def tokenize(text):
+    """
+    Splits text into lowercase terms without stop words, folding simple
+    plurals ("moves" -> "move").
+    """
+    terms = []
+    for word in WORD_RE.findall((text or '').lower()):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+class TextIndex:
+    """
+    Inverted index from terms to the weighted term frequency of each move.
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.postings = defaultdict(dict)
+        self.size = 0
+
+        for pk, description, effect in rows:
+            self.size += 1
+            frequencies = Counter()
+            for field, text in (('description', description), ('effect', effect)):
+                for term in tokenize(text):
+                    frequencies[term] += FIELD_WEIGHTS[field]
+            # Dampen long texts, like ts_rank's length normalization
+            length = 1 + math.log(1 + sum(frequencies.values()))
+            for term, frequency in frequencies.items():
+                self.postings[term][pk] = frequency / length
+
+    @classmethod
+    def build(cls, version=None):
+        return cls(Move.objects.values_list('id', 'description', 'effect'), version)
+
+    def search(self, query, limit=10):
+        """
+        Returns up to limit (id, rank) pairs of the moves containing every
+        term of query, best match first.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        postings = sorted((self.postings.get(term, {}) for term in terms), key=len)
+        if not postings[0]:
+            return []
+
+        ranks = {}
+        for pk in postings[0]:
+            if all(pk in other for other in postings[1:]):
+                ranks[pk] = sum(
+                    other[pk] * math.log(1 + self.size / len(other)) for other in postings
+                )
+        ranked = sorted(ranks.items(), key=lambda item: (-item[1], item[0]))
+        return [(pk, round(rank, 4)) for pk, rank in ranked[:limit]]
+
+_text_index = VersionedIndex(TextIndex.build)
+
+def search_moves(query, limit=10):
+    """
+    Returns up to limit (move id, rank) pairs matching every word of query
+    in the move description or effect, best match first.
+    """
+    if connection.vendor != 'postgresql':
+        return _text_index.get().search(query, limit)
+
+    tsquery = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+    rows = (
+        Move.objects
+        .filter(RawSQL(f'search_vector @@ {tsquery}', [query], output_field=BooleanField()))
+        .annotate(rank=RawSQL(f'ts_rank(search_vector, {tsquery})', [query], output_field=FloatField()))
+        .order_by('-rank', 'id')
+        .values_list('id', 'rank')[:limit]
+    )
+    return [(pk, round(rank, 4)) for pk, rank in rows]
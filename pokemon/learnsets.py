@@ -0,0 +1,167 @@
+"""
+Learnset bitmaps for "learns these moves" queries.
+
+Every Pokemon's learnset is a row of bits, one per move, packed into the
+uint64 words of a (pokemon, words) matrix. A query turns its move ids into a
+mask with the same layout, so learning all, any or none of the moves is a
+bitwise AND over every row at once instead of a join per move.
+
+The bitmaps are rebuilt on first use after the data version changes, which
+learnset edits bump through m2m_changed (see signals.py). The bitmaps are
+opt-in with POKEDEX_LEARNSET_BITMAPS; by default learnset filters are
+evaluated as semi-joins on the learnset through table.
+"""
+
+import itertools
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+
+from .cache import VersionedIndex
+from .models import MAX_ID, Move, Pokemon
+
+# Longest id list the bitmap matches are sent to the database as, which keeps
+# queries below SQLite's limit of 999 bound parameters
+MAX_LISTED_IDS = 900
+
+def sorted_unique(values):
+    values = np.sort(values)
+    return values[np.r_[True, values[1:] != values[:-1]]] if len(values) else values
+
+class LearnsetBitmaps:
+    """
+    Learnset bitmaps of every Pokemon, aligned with the `ids` array and
+    ordered by id.
+    """
+
+    def __init__(self, learnsets, pokemon_ids, move_ids, version=None):
+        self.version = version
+        self.ids = sorted_unique(np.fromiter(pokemon_ids, dtype=np.int64))
+        self.move_ids = sorted_unique(np.fromiter(move_ids, dtype=np.int64))
+        self.columns = {pk: i for i, pk in enumerate(self.move_ids.tolist())}
+
+        words = max(-(-len(self.move_ids) // 64), 1)
+        self.bits = np.zeros((len(self.ids), words), dtype=np.uint64)
+        pairs = np.fromiter(itertools.chain.from_iterable(learnsets), dtype=np.int64).reshape(-1, 2)
+        rows = self.lookup(self.ids, pairs[:, 0])
+        columns = self.lookup(self.move_ids, pairs[:, 1])
+        known = (rows >= 0) & (columns >= 0)
+
+        positions = sorted_unique(rows[known] * (words * 64) + columns[known])
+        if len(positions):
+            # Sum the distinct bits of each word, which ORs them together
+            keys = positions // 64
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            values = np.uint64(1) << (positions % 64).astype(np.uint64)
+            self.bits.ravel()[keys[starts]] = np.add.reduceat(values, starts)
+
+    @staticmethod
+    def lookup(ids, values):
+        """Returns the positions of values in the sorted ids array, or -1"""
+        positions = np.minimum(np.searchsorted(ids, values), max(len(ids) - 1, 0))
+        found = ids[positions] == values if len(ids) else np.zeros(len(values), dtype=bool)
+        return np.where(found, positions, -1)
+
+    @classmethod
+    def build(cls, version=None):
+        learnsets = Pokemon.moves.through.objects.values_list('pokemon_id', 'move_id')
+        pokemon_ids = Pokemon.objects.values_list('id', flat=True)
+        move_ids = Move.objects.values_list('id', flat=True)
+        return cls(learnsets, pokemon_ids, move_ids, version)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes + self.ids.nbytes + self.move_ids.nbytes
+
+    def mask(self, move_ids):
+        """
+        Returns the bitmap of the known moves in move_ids, and whether any
+        of them is unknown.
+        """
+        mask = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        unknown = False
+        for pk in move_ids:
+            column = self.columns.get(pk)
+            if column is None:
+                unknown = True
+            else:
+                mask[column // 64] |= np.uint64(1) << np.uint64(column % 64)
+        return mask, unknown
+
+    def match(self, all_of=(), any_of=(), none_of=()):
+        """
+        Returns a boolean array of the Pokemon that learn every move in
+        all_of, at least one move in any_of (when given) and no move in
+        none_of.
+        """
+        matched = np.ones(len(self.ids), dtype=bool)
+        if all_of:
+            mask, unknown = self.mask(all_of)
+            if unknown:
+                matched[:] = False
+            matched &= ((self.bits & mask) == mask).all(axis=1)
+        if any_of:
+            mask, _ = self.mask(any_of)
+            matched &= (self.bits & mask).any(axis=1)
+        if none_of:
+            mask, _ = self.mask(none_of)
+            matched &= ~(self.bits & mask).any(axis=1)
+        return matched
+
+    def filter(self, queryset, matched):
+        """
+        Narrows a Pokemon queryset to the matched Pokemon, listing whichever
+        of the matched or unmatched ids is shorter, or returns None when both
+        are longer than MAX_LISTED_IDS.
+        """
+        count = int(matched.sum())
+        if min(count, len(matched) - count) > MAX_LISTED_IDS:
+            return None
+        if count * 2 <= len(matched):
+            return queryset.filter(id__in=self.ids[matched].tolist())
+        return queryset.exclude(id__in=self.ids[~matched].tolist())
+
+_learnset_bitmaps = VersionedIndex(LearnsetBitmaps.build)
+
+def get_learnset_bitmaps():
+    return _learnset_bitmaps.get()
+
+def use_learnset_bitmaps():
+    """
+    Returns whether learnset filters are matched against the bitmaps.
+    """
+    return getattr(settings, 'POKEDEX_LEARNSET_BITMAPS', False)
+
+def filter_learnsets(queryset, all_of=(), any_of=(), none_of=()):
+    """
+    Narrows a Pokemon queryset to the Pokemon that learn every move in
+    all_of, at least one move in any_of (when given) and no move in none_of.
+
+    Uses the bitmaps when enabled and their matches fit in a short id list,
+    and semi-joins on the learnset through table otherwise.
+    """
+    if use_learnset_bitmaps():
+        bitmaps = get_learnset_bitmaps()
+        filtered = bitmaps.filter(queryset, bitmaps.match(all_of, any_of, none_of))
+        if filtered is not None:
+            return filtered
+
+    learnsets = Pokemon.moves.through.objects
+    if all_of:
+        # Ids too large for the database can't be learned, so they only
+        # count towards the moves to match
+        matched = (
+            learnsets.filter(move_id__in=[pk for pk in all_of if pk <= MAX_ID])
+            .values('pokemon_id')
+            .annotate(matched=Count('move_id'))
+            .filter(matched=len(set(all_of)))
+        )
+        queryset = queryset.filter(id__in=matched.values('pokemon_id'))
+    if any_of:
+        learned = learnsets.filter(move_id__in=[pk for pk in any_of if pk <= MAX_ID])
+        queryset = queryset.filter(id__in=learned.values('pokemon_id'))
+    if none_of:
+        learned = learnsets.filter(move_id__in=[pk for pk in none_of if pk <= MAX_ID])
+        queryset = queryset.exclude(id__in=learned.values('pokemon_id'))
+    return queryset
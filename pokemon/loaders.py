@@ -0,0 +1,147 @@
+"""
+Bulk loaders used by the scripts/ data scripts and the management commands.
+
+Each loader consumes batches of model field dictionaries, as produced by
+pokemon/parsers.py, and writes each batch with a single bulk statement.
+Bulk writes skip model signals, so callers are responsible for calling
+bump_data_version() once the load has been committed.
+"""
+
+from django.core.management.color import no_style
+from django.db import connections
+from django.utils import timezone
+
+from .models import DERIVED_STAT_FIELDS, Pokemon, Move
+
+POKEMON_UPDATE_FIELDS = [
+    'sprite', 'type_1', 'type_2', 'hp', 'attack', 'defense',
+    'sp_atk', 'sp_def', 'speed', 'height', 'weight', 'updated_at',
+] + DERIVED_STAT_FIELDS
+
+def load_moves(batches, errors=None):
+    """
+    Creates the moves that don't exist yet, leaving existing moves untouched.
+    When a batch repeats a name only its first row is loaded, as later rows
+    would be ignored as conflicts, and the others are added to errors.
+
+    Returns a (total, created) tuple.
+    """
+    total = created = 0
+    for batch in batches:
+        batch = dedupe_by_name(batch, 'Move', errors, keep_last=False)
+        existing = Move.objects.filter(name__in=[data['name'] for data in batch]).count()
+        Move.objects.bulk_create([Move(**data) for data in batch], ignore_conflicts=True)
+        total += len(batch)
+        created += len(batch) - existing
+    return total, created
+
+def load_pokemon(batches, errors=None):
+    """
+    Creates new Pokemon and updates existing ones, matched by name.
+
+    An upsert can't touch the same row twice, so when a batch repeats a name
+    only its last row is loaded and the others are added to errors.
+
+    Returns a (total, updated) tuple.
+    """
+    total = updated = 0
+    for batch in batches:
+        batch = dedupe_by_name(batch, 'Pokemon', errors)
+        updated += Pokemon.objects.filter(name__in=[data['name'] for data in batch]).count()
+        pokemon = [Pokemon(**data) for data in batch]
+        for obj in pokemon:
+            obj.update_derived_stats()
+
+        # Upsert on the unique name so existing Pokemon are updated with the
+        # current data in the same statement that creates the new ones
+        Pokemon.objects.bulk_create(
+            pokemon,
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=POKEMON_UPDATE_FIELDS,
+        )
+        total += len(batch)
+    return total, updated
+
+def duplicate_name_error(label, name, keep_last=True):
+    return f'duplicate {label} {name!r}, only the {"last" if keep_last else "first"} row is loaded'
+
+def dedupe_by_name(batch, label, errors=None, keep_last=True):
+    """
+    Returns the last (or first) row of each name in a batch, reporting the
+    others.
+    """
+    rows = {}
+    for data in batch:
+        name = data['name']
+        if name in rows:
+            if errors is not None:
+                errors.add(None, duplicate_name_error(label, name, keep_last))
+            if not keep_last:
+                continue
+        rows[name] = data
+    return list(rows.values())
+
+def assign_moves(learnsets, batch_size=1000):
+    """
+    Replaces the learnsets of the given Pokemon.
+
+    learnsets maps Pokemon names to lists of move names. Returns a tuple of
+    (rows inserted, Pokemon updated, missing Pokemon names, missing move names).
+    """
+    pokemon_ids = dict(Pokemon.objects.filter(name__in=learnsets).values_list('name', 'id'))
+    move_names = {name for names in learnsets.values() for name in names}
+    move_ids = dict(Move.objects.filter(name__in=move_names).values_list('name', 'id'))
+
+    through = Pokemon.moves.through
+    rows = []
+    for pokemon_name, names in learnsets.items():
+        pokemon_id = pokemon_ids.get(pokemon_name)
+        if pokemon_id is None:
+            continue
+        for move_id in dict.fromkeys(move_ids.get(name) for name in names):
+            if move_id is not None:
+                rows.append(through(pokemon_id=pokemon_id, move_id=move_id))
+
+    # Replace the existing learnsets to avoid duplicates
+    through.objects.filter(pokemon_id__in=pokemon_ids.values()).delete()
+    through.objects.bulk_create(rows, batch_size=batch_size)
+    Pokemon.objects.filter(id__in=pokemon_ids.values()).update(updated_at=timezone.now())
+
+    missing_pokemon = [name for name in learnsets if name not in pokemon_ids]
+    missing_moves = sorted(move_names - set(move_ids))
+    return len(rows), len(pokemon_ids), missing_pokemon, missing_moves
+
+def pokedex_tables():
+    """The learnset, Pokemon and Move tables, in the order they can be emptied"""
+    return [
+        Pokemon.moves.through._meta.db_table,
+        Pokemon._meta.db_table,
+        Move._meta.db_table,
+    ]
+
+def clear_tables(using='default'):
+    """
+    Empties the Pokemon, Move and learnset tables and resets their ids.
+
+    Uses the database's flush SQL: a single TRUNCATE ... RESTART IDENTITY on
+    Postgres and one DELETE per table elsewhere, so no rows are loaded into
+    Python and no delete signals are sent. On Postgres TRUNCATE locks the
+    tables against readers until the transaction ends.
+    """
+    connection = connections[using]
+    sql_list = connection.ops.sql_flush(no_style(), pokedex_tables(), reset_sequences=True)
+    connection.ops.execute_sql_flush(sql_list)
+
+def delete_tables(using='default'):
+    """
+    Empties the Pokemon, Move and learnset tables with plain DELETEs.
+
+    Unlike clear_tables this neither resets ids nor takes an exclusive lock,
+    so inside a transaction concurrent readers keep seeing the old rows
+    until it commits.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for table in pokedex_tables():
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(table)}')
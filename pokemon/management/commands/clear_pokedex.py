@@ -0,0 +1,29 @@
+"""
+Delete every Pokemon, move and learnset entry in one statement.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pokemon.cache import bump_data_version
+from pokemon.loaders import clear_tables
+
+class Command(BaseCommand):
+    help = 'Delete all Pokemon, moves and learnsets and reset their ids.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not prompt for confirmation')
+
+    def handle(self, *args, **options):
+        if options['interactive']:
+            confirm = input('This will delete ALL Pokemon and Moves from the database. Are you sure? (y/n): ')
+            if confirm.lower() != 'y':
+                self.stdout.write('Operation cancelled.')
+                return
+
+        with transaction.atomic():
+            clear_tables()
+            transaction.on_commit(bump_data_version)
+
+        self.stdout.write(self.style.SUCCESS('Database successfully cleared!'))
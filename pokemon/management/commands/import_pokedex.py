@@ -0,0 +1,304 @@
+"""
+Fast full import of Pokemon, moves and learnsets.
+
+On Postgres the CSVs are streamed into temporary staging tables with
+COPY FROM STDIN and merged into the real tables with set-based SQL. Other
+databases fall back to the bulk ORM loaders in pokemon/loaders.py.
+"""
+
+import csv
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from pokemon import loaders
+from pokemon.cache import bump_data_version
+from pokemon.models import DERIVED_STAT_FIELDS, Pokemon, Move, derive_stats
+from pokemon.parsers import (
+    DEFAULT_BATCH_SIZE, DEFAULT_MOVES_CSV, DEFAULT_POKEMON_CSV, RowErrors,
+    iter_numbered_csv_rows, load_default_learnsets, open_csv, parse_move_row, parse_pokemon_row,
+    read_moves_batches, read_pokemon_batches,
+)
+
+COPY_NULL = r'\N'
+
+MOVE_COLUMNS = ['name', 'description', 'type', 'power', 'effect', 'category', 'accuracy']
+POKEMON_COLUMNS = [
+    'name', 'sprite', 'type_1', 'type_2', 'hp', 'attack', 'defense',
+    'sp_atk', 'sp_def', 'speed', 'height', 'weight',
+] + DERIVED_STAT_FIELDS
+
+LEARNSET_COLUMNS = ['pokemon', 'move']
+
+def iter_pokemon_with_derived_stats(source, errors=None):
+    """
+    Yield (line, Pokemon row) pairs from a CSV source, with the derived stat
+    columns of each row.
+    """
+    for line, data in iter_numbered_csv_rows(source, parse_pokemon_row, errors):
+        data.update(derive_stats(data))
+        yield line, data
+
+def iter_learnset_pairs(source=None):
+    """
+    Yield (pokemon name, move name) pairs from a CSV with "pokemon" and
+    "move" columns, or from scripts/pokemon_data.py when no source is given.
+    """
+    if source is None:
+        for pokemon_name, move_names in load_default_learnsets().items():
+            for move_name in move_names:
+                yield pokemon_name, move_name
+        return
+
+    with open_csv(source) as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in LEARNSET_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise CommandError(f'Learnsets CSV is missing the {", ".join(missing)} column(s)')
+        for row in reader:
+            yield (row['pokemon'] or '').strip(), (row['move'] or '').strip()
+
+class CopyStream(io.TextIOBase):
+    """
+    File-like object serving rows as COPY CSV text, for psycopg2's copy_expert.
+    """
+    def __init__(self, rows):
+        self.chunks = iter_copy_chunks(rows)
+        self.buffer = ''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+def iter_copy_chunks(rows, rows_per_chunk=1000):
+    """
+    Yield CSV text for COPY, writing None as the COPY NULL marker.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for i, row in enumerate(rows, 1):
+        writer.writerow([COPY_NULL if value is None else value for value in row])
+        if i % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Stream rows into a table with COPY FROM STDIN on psycopg2 or psycopg 3.
+    """
+    quote = connection.ops.quote_name
+    sql = (
+        f'COPY {quote(table)} ({", ".join(quote(column) for column in columns)}) '
+        f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+    raw_cursor = cursor.cursor
+    if hasattr(raw_cursor, 'copy_expert'):
+        raw_cursor.copy_expert(sql, CopyStream(rows))
+    else:
+        with raw_cursor.copy(sql) as copy:
+            for chunk in iter_copy_chunks(rows):
+                copy.write(chunk)
+
+class Command(BaseCommand):
+    help = 'Import Pokemon, moves and learnsets from CSV files, using COPY on Postgres.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pokemon', default=DEFAULT_POKEMON_CSV,
+                            help='Pokemon CSV file, or "-" for stdin (default: scripts/pokemon.csv)')
+        parser.add_argument('--moves', default=DEFAULT_MOVES_CSV,
+                            help='Moves CSV file, or "-" for stdin (default: scripts/moves.csv)')
+        parser.add_argument('--learnsets',
+                            help='CSV of "pokemon,move" pairs (default: scripts/pokemon_data.py)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows per batch for the ORM fallback')
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Use the bulk ORM loaders even on Postgres')
+
+    def handle(self, *args, **options):
+        use_copy = self.use_copy(options)
+        start = time.perf_counter()
+
+        with transaction.atomic():
+            self.run_import(options, use_copy)
+
+        method = 'COPY' if use_copy else 'bulk ORM'
+        self.stdout.write(self.style.SUCCESS(
+            f'Import complete using {method} in {time.perf_counter() - start:.2f}s'
+        ))
+
+    def use_copy(self, options):
+        return connection.vendor == 'postgresql' and not options['no_copy']
+
+    def run_import(self, options, use_copy):
+        errors = RowErrors(self.stderr)
+        if use_copy:
+            self.import_with_copy(options, errors)
+        else:
+            self.import_with_orm(options, errors)
+        if errors:
+            self.stderr.write(f'Skipped {len(errors)} invalid rows')
+        transaction.on_commit(bump_data_version)
+
+    def timed(self, label, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.stdout.write(f'{label} took {time.perf_counter() - start:.2f}s')
+        return result
+
+    def import_with_orm(self, options, errors):
+        batch_size = options['batch_size']
+        total, created = self.timed(
+            'Loading moves', loaders.load_moves,
+            read_moves_batches(options['moves'], batch_size, errors), errors,
+        )
+        self.stdout.write(f'Loaded {total} moves ({created} new)')
+
+        total, updated = self.timed(
+            'Loading Pokemon', loaders.load_pokemon,
+            read_pokemon_batches(options['pokemon'], batch_size, errors), errors,
+        )
+        self.stdout.write(f'Loaded {total} Pokemon ({total - updated} new, {updated} updated)')
+
+        learnsets = {}
+        for pokemon_name, move_name in iter_learnset_pairs(options['learnsets']):
+            learnsets.setdefault(pokemon_name, []).append(move_name)
+        rows, pokemon_count, missing_pokemon, missing_moves = self.timed(
+            'Assigning moves', loaders.assign_moves, learnsets, batch_size
+        )
+        self.report_learnsets(rows, pokemon_count, len(missing_pokemon) + len(missing_moves))
+
+    def import_with_copy(self, options, errors):
+        quote = connection.ops.quote_name
+        move_table = quote(Move._meta.db_table)
+        pokemon_table = quote(Pokemon._meta.db_table)
+        through_table = quote(Pokemon.moves.through._meta.db_table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE move_stage (line integer, '
+                'name text, description text, type text, power integer, effect text, '
+                'category text, accuracy integer) ON COMMIT DROP'
+            )
+            cursor.execute(
+                'CREATE TEMPORARY TABLE pokemon_stage (line integer, '
+                'name text, sprite text, type_1 text, type_2 text, hp integer, attack integer, '
+                'defense integer, sp_atk integer, sp_def integer, speed integer, '
+                'height double precision, weight double precision, base_stat_total integer, '
+                'physical_bulk integer, special_bulk integer, bmi double precision) ON COMMIT DROP'
+            )
+            cursor.execute(
+                'CREATE TEMPORARY TABLE learnset_stage (pokemon text, move text) ON COMMIT DROP'
+            )
+
+            def stage_and_merge_moves():
+                rows = ([line] + [data[column] for column in MOVE_COLUMNS]
+                        for line, data in iter_numbered_csv_rows(options['moves'], parse_move_row, errors))
+                copy_rows(cursor, 'move_stage', ['line'] + MOVE_COLUMNS, rows)
+                self.report_duplicates(cursor, 'move_stage', 'Move', errors, keep_last=False)
+                columns = ', '.join(quote(column) for column in MOVE_COLUMNS)
+                # Keep the first row of each name, like the bulk ORM loader
+                cursor.execute(
+                    f'INSERT INTO {move_table} ({columns}, updated_at) '
+                    f'SELECT DISTINCT ON (name) {columns}, now() FROM move_stage '
+                    f'ORDER BY name, line '
+                    f'ON CONFLICT (name) DO NOTHING'
+                )
+                return cursor.rowcount
+
+            created = self.timed('Loading moves', stage_and_merge_moves)
+            self.stdout.write(f'Loaded moves ({created} new)')
+
+            def stage_and_merge_pokemon():
+                rows = ([line] + [data[column] for column in POKEMON_COLUMNS]
+                        for line, data in iter_pokemon_with_derived_stats(options['pokemon'], errors))
+                copy_rows(cursor, 'pokemon_stage', ['line'] + POKEMON_COLUMNS, rows)
+                self.report_duplicates(cursor, 'pokemon_stage', 'Pokemon', errors, keep_last=True)
+                columns = ', '.join(quote(column) for column in POKEMON_COLUMNS)
+                updates = ', '.join(
+                    f'{quote(column)} = EXCLUDED.{quote(column)}'
+                    for column in POKEMON_COLUMNS if column != 'name'
+                )
+                # Keep the last row of each name, like the bulk ORM loader
+                cursor.execute(
+                    f'INSERT INTO {pokemon_table} ({columns}, updated_at) '
+                    f'SELECT DISTINCT ON (name) {columns}, now() FROM pokemon_stage '
+                    f'ORDER BY name, line DESC '
+                    f'ON CONFLICT (name) DO UPDATE SET {updates}, updated_at = EXCLUDED.updated_at'
+                )
+                return cursor.rowcount
+
+            total = self.timed('Loading Pokemon', stage_and_merge_pokemon)
+            self.stdout.write(f'Loaded {total} Pokemon')
+
+            def stage_and_merge_learnsets():
+                copy_rows(cursor, 'learnset_stage', ['pokemon', 'move'],
+                          iter_learnset_pairs(options['learnsets']))
+                cursor.execute(
+                    f'SELECT count(*) FROM learnset_stage s '
+                    f'LEFT JOIN {pokemon_table} p ON p.name = s.pokemon '
+                    f'LEFT JOIN {move_table} m ON m.name = s.move '
+                    f'WHERE p.id IS NULL OR m.id IS NULL'
+                )
+                missing = cursor.fetchone()[0]
+
+                # Replace the learnsets of every staged Pokemon
+                cursor.execute(
+                    f'CREATE TEMPORARY TABLE learnset_pokemon ON COMMIT DROP AS '
+                    f'SELECT DISTINCT p.id FROM learnset_stage s '
+                    f'JOIN {pokemon_table} p ON p.name = s.pokemon'
+                )
+                cursor.execute(
+                    f'DELETE FROM {through_table} '
+                    f'WHERE pokemon_id IN (SELECT id FROM learnset_pokemon)'
+                )
+                cursor.execute(
+                    f'INSERT INTO {through_table} (pokemon_id, move_id) '
+                    f'SELECT DISTINCT p.id, m.id FROM learnset_stage s '
+                    f'JOIN {pokemon_table} p ON p.name = s.pokemon '
+                    f'JOIN {move_table} m ON m.name = s.move'
+                )
+                rows = cursor.rowcount
+                cursor.execute(
+                    f'UPDATE {pokemon_table} SET updated_at = now() '
+                    f'WHERE id IN (SELECT id FROM learnset_pokemon)'
+                )
+                return rows, cursor.rowcount, missing
+
+            rows, pokemon_count, missing = self.timed('Assigning moves', stage_and_merge_learnsets)
+            self.report_learnsets(rows, pokemon_count, missing)
+
+    def report_duplicates(self, cursor, table, label, errors, keep_last):
+        """
+        Adds the staged rows sharing a name with the row that is kept to
+        errors, as the bulk ORM loaders do.
+        """
+        order = 'DESC' if keep_last else ''
+        cursor.execute(
+            f'SELECT line, name FROM ('
+            f'SELECT line, name, row_number() OVER (PARTITION BY name ORDER BY line {order}) AS position '
+            f'FROM {table}) ranked WHERE position > 1 ORDER BY line'
+        )
+        for line, name in cursor:
+            errors.add(line, loaders.duplicate_name_error(label, name, keep_last))
+
+    def report_learnsets(self, rows, pokemon_count, missing):
+        self.stdout.write(f'Assigned {rows} moves to {pokemon_count} Pokemon')
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'{missing} learnset entries reference unknown Pokemon or moves'
+            ))
@@ -0,0 +1,30 @@
+"""
+Clear and re-import the Pokedex in a single transaction.
+
+The tables are emptied with DELETE rather than TRUNCATE, so readers are not
+blocked and keep seeing the previous data until the new data is committed:
+the Pokedex is never observed half-empty.
+"""
+
+import time
+
+from django.db import transaction
+
+from pokemon.loaders import delete_tables
+from .import_pokedex import Command as ImportCommand
+
+class Command(ImportCommand):
+    help = 'Delete all Pokemon, moves and learnsets and import them again atomically.'
+
+    def handle(self, *args, **options):
+        use_copy = self.use_copy(options)
+        start = time.perf_counter()
+
+        with transaction.atomic():
+            self.timed('Clearing tables', delete_tables)
+            self.run_import(options, use_copy)
+
+        method = 'COPY' if use_copy else 'bulk ORM'
+        self.stdout.write(self.style.SUCCESS(
+            f'Reload complete using {method} in {time.perf_counter() - start:.2f}s'
+        ))
@@ -0,0 +1,102 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:38
+
+from django.db import migrations, models
+
+# SearchFilter's icontains lookups compile to UPPER(column::text) LIKE ... on
+# Postgres, so the trigram indexes are built on the same expression.
+TRIGRAM_INDEXES = [
+    ('pokemon_name_trgm_idx', 'pokemon_pokemon', 'name'),
+    ('pokemon_type_1_trgm_idx', 'pokemon_pokemon', 'type_1'),
+    ('pokemon_type_2_trgm_idx', 'pokemon_pokemon', 'type_2'),
+    ('move_name_trgm_idx', 'pokemon_move', 'name'),
+    ('move_description_trgm_idx', 'pokemon_move', 'description'),
+    ('move_type_trgm_idx', 'pokemon_move', 'type'),
+    ('move_category_trgm_idx', 'pokemon_move', 'category'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0003_pokemon_height_pokemon_weight'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='move',
+            name='name',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='pokemon',
+            name='name',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='move',
+            index=models.Index(fields=['type', 'category'], name='move_type_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='move',
+            index=models.Index(fields=['category'], name='move_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='move',
+            index=models.Index(fields=['power'], name='move_power_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='move',
+            index=models.Index(fields=['accuracy'], name='move_accuracy_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['type_1', 'type_2'], name='pokemon_types_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['type_2'], name='pokemon_type_2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['hp'], name='pokemon_hp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['attack'], name='pokemon_attack_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['defense'], name='pokemon_defense_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['sp_atk'], name='pokemon_sp_atk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['sp_def'], name='pokemon_sp_def_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['speed'], name='pokemon_speed_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
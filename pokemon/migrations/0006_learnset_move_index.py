@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:49
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0005_updated_at'),
+    ]
+
+    # The auto-created through table only indexes (pokemon_id, move_id) and
+    # move_id alone; reverse lookups page through a move's Pokemon by id.
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX pokemon_pokemon_moves_move_pokemon_idx '
+            'ON pokemon_pokemon_moves (move_id, pokemon_id)',
+            'DROP INDEX pokemon_pokemon_moves_move_pokemon_idx',
+        ),
+    ]
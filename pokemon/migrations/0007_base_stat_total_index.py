@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:50
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0006_learnset_move_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('hp'), '+', models.F('attack')), '+', models.F('defense')), '+', models.F('sp_atk')), '+', models.F('sp_def')), '+', models.F('speed')), name='pokemon_base_stat_total_idx'),
+        ),
+    ]
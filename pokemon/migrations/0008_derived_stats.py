@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:52
+
+from django.db import migrations, models
+from django.db.models import Case, F, When
+
+
+def backfill_derived_stats(apps, schema_editor):
+    # A single UPDATE computing the same values as pokemon.models.derive_stats()
+    Pokemon = apps.get_model('pokemon', 'Pokemon')
+    Pokemon.objects.update(
+        base_stat_total=F('hp') + F('attack') + F('defense') + F('sp_atk') + F('sp_def') + F('speed'),
+        physical_bulk=F('hp') * F('defense'),
+        special_bulk=F('hp') * F('sp_def'),
+        bmi=Case(
+            When(height__gt=0, then=F('weight') / (F('height') * F('height'))),
+            default=None,
+            output_field=models.FloatField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0007_base_stat_total_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pokemon',
+            name='pokemon_base_stat_total_idx',
+        ),
+        migrations.AddField(
+            model_name='pokemon',
+            name='base_stat_total',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pokemon',
+            name='bmi',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='pokemon',
+            name='physical_bulk',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pokemon',
+            name='special_bulk',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_derived_stats, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['base_stat_total'], name='pokemon_base_stat_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['physical_bulk'], name='pokemon_physical_bulk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['special_bulk'], name='pokemon_special_bulk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pokemon',
+            index=models.Index(fields=['bmi'], name='pokemon_bmi_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:57
+
+from django.db import migrations
+
+# Generated columns are recomputed by Postgres on every write, so ORM saves,
+# bulk loads and COPY imports all keep the vector current. The column is not
+# declared on the Move model and is only read by pokemon/fulltext.py.
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(description, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(effect, '')), 'B')"
+)
+
+
+def add_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'ALTER TABLE "pokemon_move" ADD COLUMN "search_vector" tsvector '
+        f'GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED'
+    )
+    schema_editor.execute(
+        'CREATE INDEX "move_search_vector_idx" ON "pokemon_move" USING gin ("search_vector")'
+    )
+
+
+def remove_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE "pokemon_move" DROP COLUMN IF EXISTS "search_vector"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0008_derived_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, remove_search_vector),
+    ]
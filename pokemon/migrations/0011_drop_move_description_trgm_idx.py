@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:12
+
+from django.db import migrations
+
+# Move search goes through the search_vector GIN index and SearchFilter does
+# not search descriptions, so this index only slowed down writes to moves.
+INDEX_NAME = 'move_description_trgm_idx'
+
+
+def drop_description_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{INDEX_NAME}"')
+
+
+def create_description_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS "{INDEX_NAME}" ON "pokemon_move" '
+        f'USING gin (UPPER("description"::text) gin_trgm_ops)'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pokemon', '0010_data_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_description_trigram_index, create_description_trigram_index),
+    ]
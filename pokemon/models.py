@@ -1,7 +1,27 @@
 from django.db import models
 
+STAT_FIELDS = ['hp', 'attack', 'defense', 'sp_atk', 'sp_def', 'speed']
+DERIVED_STAT_FIELDS = ['base_stat_total', 'physical_bulk', 'special_bulk', 'bmi']
+DERIVED_STAT_SOURCES = set(STAT_FIELDS) | {'height', 'weight'}
+# Ids outside the 64-bit integers of the database can't match any row, and
+# overflow the query when used in a lookup
+MIN_ID, MAX_ID = -2 ** 63, 2 ** 63 - 1
+
+def derive_stats(values):
+    """
+    Computes the derived stat columns from a mapping of the base stats,
+    height and weight. BMI is None when the height is unknown.
+    """
+    height = values.get('height') or 0
+    return {
+        'base_stat_total': sum(values[field] for field in STAT_FIELDS),
+        'physical_bulk': values['hp'] * values['defense'],
+        'special_bulk': values['hp'] * values['sp_def'],
+        'bmi': (values.get('weight') or 0) / height ** 2 if height > 0 else None,
+    }
+
 class Pokemon(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, unique=True)
     sprite = models.URLField(blank=True, null=True)
     type_1 = models.CharField(max_length=50)
     type_2 = models.CharField(max_length=50, blank=True, null=True)
@@ -14,10 +34,48 @@ class Pokemon(models.Model):
     height = models.FloatField(default=0)  # Height in meters
     weight = models.FloatField(default=0)  # Weight in kilograms
     moves = models.ManyToManyField('Move', blank=True, related_name='pokemon')
+    # Derived from the stats above on every save and bulk load, see derive_stats()
+    base_stat_total = models.IntegerField(default=0, editable=False)
+    physical_bulk = models.IntegerField(default=0, editable=False)  # hp * defense
+    special_bulk = models.IntegerField(default=0, editable=False)  # hp * sp_def
+    bmi = models.FloatField(null=True, blank=True, editable=False)  # weight / height^2
+    # Also touched when the learnset or one of the learned moves changes
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # Cover every filter and ordering field exposed by PokemonViewSet.
+        # Trigram indexes for search are created in migration 0004 on Postgres.
+        indexes = [
+            models.Index(fields=['type_1', 'type_2'], name='pokemon_types_idx'),
+            models.Index(fields=['type_2'], name='pokemon_type_2_idx'),
+            models.Index(fields=['hp'], name='pokemon_hp_idx'),
+            models.Index(fields=['attack'], name='pokemon_attack_idx'),
+            models.Index(fields=['defense'], name='pokemon_defense_idx'),
+            models.Index(fields=['sp_atk'], name='pokemon_sp_atk_idx'),
+            models.Index(fields=['sp_def'], name='pokemon_sp_def_idx'),
+            models.Index(fields=['speed'], name='pokemon_speed_idx'),
+            models.Index(fields=['base_stat_total'], name='pokemon_base_stat_total_idx'),
+            models.Index(fields=['physical_bulk'], name='pokemon_physical_bulk_idx'),
+            models.Index(fields=['special_bulk'], name='pokemon_special_bulk_idx'),
+            models.Index(fields=['bmi'], name='pokemon_bmi_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def update_derived_stats(self):
+        for field, value in derive_stats(vars(self)).items():
+            setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        # Skip the recomputation when a source field was deferred and not loaded
+        if not DERIVED_STAT_SOURCES & self.get_deferred_fields():
+            self.update_derived_stats()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and DERIVED_STAT_SOURCES & set(update_fields):
+                kwargs['update_fields'] = set(update_fields) | set(DERIVED_STAT_FIELDS)
+        super().save(*args, **kwargs)
+
 class Move(models.Model):
     MOVE_TYPES = [
         ('normal', 'Normal'),
@@ -46,13 +104,37 @@ class Move(models.Model):
         ('status', 'Status'),
     ]
     
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, unique=True)
     description = models.TextField()
     type = models.CharField(max_length=20, choices=MOVE_TYPES)
     power = models.IntegerField(null=True, blank=True)  # Null for status moves
     effect = models.TextField(blank=True, null=True)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     accuracy = models.IntegerField(null=True, blank=True)  # Null for moves that never miss
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # On Postgres the table also has a generated search_vector column over
+    # description and effect (migration 0009). It only exists in the database,
+    # so it is not declared here and is only queried by fulltext.py.
+    
+    class Meta:
+        # Cover every filter and ordering field exposed by MoveViewSet
+        indexes = [
+            models.Index(fields=['type', 'category'], name='move_type_category_idx'),
+            models.Index(fields=['category'], name='move_category_idx'),
+            models.Index(fields=['power'], name='move_power_idx'),
+            models.Index(fields=['accuracy'], name='move_accuracy_idx'),
+        ]
     
     def __str__(self):
         return self.name
+
+class DataVersion(models.Model):
+    """
+    Single-row counter bumped whenever Pokedex data changes. Cached responses
+    and in-process indexes are keyed on it, and it is kept in the database
+    so that every worker and management command sees the same value.
+    """
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return str(self.version)
@@ -0,0 +1,286 @@
+"""
+Pagination for the Pokemon and Move endpoints.
+
+Page number pagination stays the default. Passing `?pagination=cursor`
+switches to keyset pagination, which seeks past the last row of the previous
+page instead of using OFFSET and does not count the table. The `count`
+parameter controls how the total is computed in either mode: `exact`,
+`estimate` (planner row estimate on Postgres) or `none`.
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+def estimate_count(queryset):
+    """
+    Returns the planner's row estimate for a queryset on Postgres, falling
+    back to an exact count on other databases.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+def get_count_mode(request, default):
+    mode = request.query_params.get('count', default)
+    return mode if mode in COUNT_MODES else default
+
+def count_queryset(queryset, mode):
+    if mode == 'exact':
+        return queryset.count()
+    if mode == 'estimate':
+        return estimate_count(queryset)
+    return None
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over any whitelisted ordering field.
+
+    Rows are ordered by the requested fields followed by `id`, so the order
+    is total even when the fields contain duplicates or NULLs (which always
+    sort last). Cursors encode the ordering values of the boundary row and a
+    flag saying whether to page forwards or backwards from it.
+    """
+    page_size = PageNumberPagination.page_size
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = count_queryset(queryset, get_count_mode(request, 'none'))
+
+        fields = self.get_ordering_fields(request, queryset, view)
+        values, reverse = self.decode_cursor(request)
+        if reverse:
+            fields = [(name, not descending, nullable) for name, descending, nullable in fields]
+
+        queryset = queryset.order_by(*self.get_order_by(fields, reverse))
+        if values is not None:
+            values = self.clean_cursor_values(queryset.model, fields, values)
+            queryset = queryset.filter(self.get_seek_filter(fields, values, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            fields = [(name, not descending, nullable) for name, descending, nullable in fields]
+
+        self.fields = fields
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else values is not None
+        self.results = results
+        return results
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_ordering_fields(self, request, queryset, view):
+        """
+        Returns the ordering as (name, descending, nullable) tuples, ending
+        with `id` as the tie-break.
+        """
+        # Sub-resources of another model (e.g. a move's Pokemon) keep the
+        # queryset's own ordering instead of the view's ordering filter
+        ordering = list(queryset.query.order_by)
+        view_queryset = getattr(view, 'queryset', None)
+        if view_queryset is not None and view_queryset.model is queryset.model:
+            for backend in getattr(view, 'filter_backends', []):
+                if issubclass(backend, OrderingFilter):
+                    ordering = backend().get_ordering(request, queryset, view) or []
+                    break
+
+        fields = []
+        for term in ordering:
+            name = term.lstrip('-')
+            if name == 'pk':
+                name = 'id'
+            nullable = queryset.model._meta.get_field(name).null
+            fields.append((name, term.startswith('-'), nullable))
+            if name == 'id':
+                return fields
+
+        descending = fields[0][1] if fields else False
+        return fields + [('id', descending, False)]
+
+    def get_order_by(self, fields, reverse):
+        order_by = []
+        for name, descending, nullable in fields:
+            # NULLs sort last going forwards, so they sort first going backwards
+            nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+            expression = F(name).desc(**nulls) if descending else F(name).asc(**nulls)
+            order_by.append(expression if nullable else f'-{name}' if descending else name)
+        return order_by
+
+    def clean_cursor_values(self, model, fields, values):
+        """
+        Converts the cursor values to the types of their fields, rejecting
+        cursors that do not match the ordering.
+        """
+        if len(values) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+        cleaned = []
+        for (name, _, nullable), value in zip(fields, values):
+            if value is None and not nullable:
+                raise NotFound(self.invalid_cursor_message)
+            if isinstance(value, (list, dict)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                cleaned.append(model._meta.get_field(name).to_python(value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def get_seek_filter(self, fields, values, reverse):
+        """
+        Builds the lexicographic "comes after `values`" condition.
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending, nullable), value in zip(fields, values):
+            lookup = 'lt' if descending else 'gt'
+            if value is None:
+                # NULLs are at the end going forwards, at the start going backwards
+                after = Q(**{f'{name}__isnull': False}) if reverse else None
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                after = Q(**{f'{name}__{lookup}': value})
+                if nullable and not reverse:
+                    after |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            if after is not None:
+                condition |= equal & after
+            equal &= same
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if not isinstance(cursor['p'], list):
+                raise TypeError
+            return cursor['p'], bool(cursor.get('r'))
+        except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        cursor = {'p': [getattr(instance, name) for name, _, _ in self.fields]}
+        if reverse:
+            cursor['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.results:
+            return None
+        return self.encode_cursor(self.results[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.results:
+            return None
+        return self.encode_cursor(self.results[0], reverse=True)
+
+class PokedexPagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset mode (`?pagination=cursor`)
+    and a configurable total count (`?count=exact|estimate|none`).
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.keyset_class.cursor_query_param in request.query_params):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        count_mode = get_count_mode(request, 'exact')
+        if count_mode == 'exact':
+            return super().paginate_queryset(queryset, request, view)
+
+        # Skip the paginator's COUNT(*) and detect the next page by
+        # fetching one extra row
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params.get(self.page_query_param), message='Invalid page.'
+            ))
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=self.page_number, message='Invalid page.'
+            ))
+
+        self.count = count_queryset(queryset, count_mode)
+        offset = (self.page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(results) > page_size
+        self.page = None
+        return results[:page_size]
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        if self.page is not None:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if self.page is not None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page is not None:
+            return super().get_previous_link()
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
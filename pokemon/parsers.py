@@ -0,0 +1,186 @@
+"""
+Parsers for the Pokemon and moves CSV files.
+
+Rows are read lazily: the iter_* generators validate and yield one row at a
+time and read_*_batches groups them into lists of a configurable size, so
+arbitrarily large files can be loaded in constant memory. Any file path can
+be given, or "-" to read from stdin. Invalid rows are reported and skipped.
+
+Used by the import_pokedex command and the scripts/ data scripts.
+"""
+
+import csv
+import importlib.util
+import os
+import sys
+from contextlib import contextmanager
+from itertools import islice
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+DEFAULT_POKEMON_CSV = os.path.join(SCRIPTS_DIR, 'pokemon.csv')
+DEFAULT_MOVES_CSV = os.path.join(SCRIPTS_DIR, 'moves.csv')
+DEFAULT_LEARNSETS = os.path.join(SCRIPTS_DIR, 'pokemon_data.py')
+DEFAULT_BATCH_SIZE = 1000
+# Invalid rows kept for the final report, beyond which they are only counted
+MAX_REPORTED_ERRORS = 100
+
+MOVE_CATEGORIES = {'physical', 'special', 'status'}
+
+@contextmanager
+def open_csv(source):
+    """
+    Open a CSV source, which may be a path, "-" for stdin, or an open file.
+    """
+    if source == '-':
+        yield sys.stdin
+    elif hasattr(source, 'read'):
+        yield source
+    else:
+        with open(source, 'r', newline='') as f:
+            yield f
+
+class RowErrors:
+    """
+    Collects the rows skipped while loading.
+
+    Every skipped row is counted, but only the first `limit` are kept as
+    (line, message) pairs and written to `stream`, so a bad file can't
+    flood the output or memory. line is None for rows dropped after parsing.
+    """
+
+    def __init__(self, stream=None, limit=MAX_REPORTED_ERRORS):
+        self.stream = stream
+        self.limit = limit
+        self.count = 0
+        self.rows = []
+
+    def __len__(self):
+        return self.count
+
+    def add(self, line, message):
+        self.count += 1
+        if len(self.rows) >= self.limit:
+            return
+        self.rows.append((line, message))
+        if self.stream is not None:
+            where = f'line {line}' if line is not None else 'row'
+            self.stream.write(f'Skipping {where}: {message}\n')
+            if self.count == self.limit:
+                self.stream.write(f'Only the first {self.limit} skipped rows are reported\n')
+
+def iter_csv_rows(source, parse_row, errors=None):
+    """
+    Yield parsed rows from a CSV source.
+
+    parse_row maps a raw CSV row to a dictionary of model fields, returns
+    None to skip the row, or raises ValueError/KeyError for invalid rows.
+    Invalid rows are added to errors, a RowErrors, when one is given.
+    """
+    for _, parsed in iter_numbered_csv_rows(source, parse_row, errors):
+        yield parsed
+
+def iter_numbered_csv_rows(source, parse_row, errors=None):
+    """Yield (line, parsed row) pairs from a CSV source, like iter_csv_rows"""
+    with open_csv(source) as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                parsed = parse_row(row)
+            except (KeyError, ValueError, TypeError) as e:
+                message = f'{type(e).__name__}: {e}'
+                if errors is not None:
+                    errors.add(reader.line_num, message)
+                continue
+            if parsed is not None:
+                yield reader.line_num, parsed
+
+def batched(rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of up to batch_size rows from an iterable"""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def parse_optional_int(value):
+    return int(float(value)) if value else None
+
+def parse_pokemon_row(row):
+    """Map a pokemon.csv row to Pokemon model fields"""
+    name = row['Name'].strip()
+    if not name:
+        raise ValueError('missing name')
+
+    # Skip Mega Evolution forms
+    if 'Mega' in name:
+        return None
+
+    if not row['Type 1']:
+        raise ValueError('missing Type 1')
+
+    return {
+        'name': name,
+        'type_1': row['Type 1'],
+        'type_2': row['Type 2'] if row['Type 2'] else None,
+        'hp': int(row['HP']),
+        'attack': int(row['Attack']),
+        'defense': int(row['Defense']),
+        'sp_atk': int(row['Sp. Atk']),
+        'sp_def': int(row['Sp. Def']),
+        'speed': int(row['Speed']),
+        # Set default values for missing fields
+        'sprite': f'https://img.pokemondb.net/sprites/sword-shield/icon/{name.lower()}.png',
+        'height': 0.0,  # Default height
+        'weight': 0.0,  # Default weight
+    }
+
+def parse_move_row(row):
+    """Map a moves.csv row to Move model fields"""
+    name = row['name'].strip()
+    if not name:
+        raise ValueError('missing name')
+
+    category = row['damage_class'].lower()
+    if category not in MOVE_CATEGORIES:
+        raise ValueError(f"unknown damage class {row['damage_class']!r}")
+
+    if not row['type']:
+        raise ValueError('missing type')
+
+    short_description = row.get('short_descripton')
+    return {
+        'name': name,
+        'type': row['type'].lower(),
+        'power': parse_optional_int(row['power']),
+        'category': category,
+        'accuracy': parse_optional_int(row['accuracy']),
+        'effect': short_description if short_description is not None else '',
+        'description': f"{name} - {short_description if short_description is not None else 'A powerful move.'}"
+    }
+
+def iter_pokemon_from_csv(source=DEFAULT_POKEMON_CSV, errors=None):
+    """Yield validated Pokemon rows from a CSV source"""
+    return iter_csv_rows(source, parse_pokemon_row, errors)
+
+def iter_moves_from_csv(source=DEFAULT_MOVES_CSV, errors=None):
+    """Yield validated Move rows from a CSV source"""
+    return iter_csv_rows(source, parse_move_row, errors)
+
+def read_pokemon_batches(source=DEFAULT_POKEMON_CSV, batch_size=DEFAULT_BATCH_SIZE, errors=None):
+    """Yield lists of up to batch_size validated Pokemon rows"""
+    return batched(iter_pokemon_from_csv(source, errors), batch_size)
+
+def read_moves_batches(source=DEFAULT_MOVES_CSV, batch_size=DEFAULT_BATCH_SIZE, errors=None):
+    """Yield lists of up to batch_size validated Move rows"""
+    return batched(iter_moves_from_csv(source, errors), batch_size)
+
+def load_default_learnsets():
+    """
+    Returns the pokemon_moves dictionary of scripts/pokemon_data.py, which
+    maps Pokemon names to the names of the moves they learn.
+    """
+    spec = importlib.util.spec_from_file_location('pokemon_data', DEFAULT_LEARNSETS)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.pokemon_moves
@@ -0,0 +1,266 @@
+"""
+Fuzzy and prefix name search over Pokemon and moves.
+
+The default backend keeps an in-process index of every name: a sorted array
+of name and word keys for prefix matches, and trigram postings for typo
+tolerant matches scored like pg_trgm's similarity(). The index is built on
+the first search and rebuilt whenever the data version changes, which the
+signal handlers in signals.py and the bulk write paths bump on every write.
+
+Setting POKEDEX_SEARCH_BACKEND = 'trigram' queries the pg_trgm indexes from
+migration 0004 instead, so every process of a multi-process deployment
+sees writes immediately without holding its own index. Autocomplete always
+uses the in-process index, since it serves a request per keystroke.
+"""
+
+import bisect
+import re
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db.models import BooleanField, Case, F, FloatField, Func, Q, Value, When
+from django.db.models.functions import Length, Upper
+
+from .cache import VersionedIndex
+from .models import Pokemon, Move
+
+SEARCH_KINDS = ('pokemon', 'move')
+SIMILARITY_THRESHOLD = 0.3  # pg_trgm's default similarity threshold
+
+# Results matching a prefix of the whole name rank above results matching a
+# prefix of one of its words, which rank above fuzzy matches
+EXACT_BOOST = 3
+PREFIX_BOOST = 2
+WORD_PREFIX_BOOST = 1
+
+Entry = namedtuple('Entry', ['kind', 'id', 'name', 'sprite', 'key', 'trigrams'])
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+def normalize(text):
+    """Lowercases text and collapses everything but letters and digits to spaces"""
+    return ' '.join(WORD_RE.findall(text.lower()))
+
+def trigrams(text):
+    """
+    Returns the trigram set of a string the way pg_trgm computes it: each
+    word is padded with two spaces in front and one behind.
+    """
+    result = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+class NameIndex:
+    """
+    Immutable search index over a list of (kind, id, name, sprite) rows.
+
+    Prefix lookups binary search two sorted arrays: one of whole names and
+    one of the names from their second word onwards (e.g. "blast" for
+    "fire blast"), each with a parallel array of entry positions.
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.entries = []
+        self.postings = {}
+        name_keys = []
+        word_keys = []
+
+        for kind, pk, name, sprite in rows:
+            key = normalize(name)
+            entry = Entry(kind, pk, name, sprite, key, frozenset(trigrams(name)))
+            position = len(self.entries)
+            self.entries.append(entry)
+            for trigram in entry.trigrams:
+                self.postings.setdefault(trigram, []).append(position)
+
+            name_keys.append((key, position))
+            words = key.split(' ')
+            for i in range(1, len(words)):
+                word_keys.append((' '.join(words[i:]), position))
+
+        name_keys.sort()
+        word_keys.sort()
+        self.name_keys = [key for key, _ in name_keys]
+        self.name_positions = [position for _, position in name_keys]
+        self.word_keys = [key for key, _ in word_keys]
+        self.word_positions = [position for _, position in word_keys]
+
+    @classmethod
+    def build(cls, version=None):
+        rows = [('pokemon', *row) for row in Pokemon.objects.values_list('id', 'name', 'sprite')]
+        rows += [('move', pk, name, None) for pk, name in Move.objects.values_list('id', 'name')]
+        return cls(rows, version)
+
+    @staticmethod
+    def iter_prefix(keys, positions, key):
+        start = bisect.bisect_left(keys, key)
+        for i in range(start, len(keys)):
+            if not keys[i].startswith(key):
+                break
+            yield positions[i]
+
+    def prefix_matches(self, key):
+        """
+        Yields (position, is_word) for the entries whose name starts with
+        key, in name order, then for those with a later word starting with it.
+        """
+        for position in self.iter_prefix(self.name_keys, self.name_positions, key):
+            yield position, False
+        for position in self.iter_prefix(self.word_keys, self.word_positions, key):
+            yield position, True
+
+    def complete(self, query, kinds=SEARCH_KINDS, limit=10):
+        """
+        Returns up to limit entries whose name or a word of it starts with
+        query, names first and each group in alphabetical order. Only the
+        matches that are returned are visited.
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        results = []
+        seen = set()
+        for position, _ in self.prefix_matches(key):
+            entry = self.entries[position]
+            if entry.kind in kinds and position not in seen:
+                seen.add(position)
+                results.append(entry)
+                if len(results) == limit:
+                    break
+        return results
+
+    def search(self, query, kinds=SEARCH_KINDS, limit=10):
+        """
+        Returns up to limit (score, entry) pairs, best match first.
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        query_trigrams = trigrams(query)
+
+        boosts = {}
+        for position, is_word in self.prefix_matches(key):
+            entry = self.entries[position]
+            if entry.key == key:
+                boost = EXACT_BOOST
+            else:
+                boost = WORD_PREFIX_BOOST if is_word else PREFIX_BOOST
+            boosts[position] = max(boosts.get(position, 0), boost)
+
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self.postings.get(trigram, ()))
+
+        scored = []
+        for position in boosts.keys() | shared.keys():
+            entry = self.entries[position]
+            if entry.kind not in kinds:
+                continue
+            count = shared.get(position, 0)
+            score = count / (len(query_trigrams) + len(entry.trigrams) - count) if count else 0.0
+            if position in boosts:
+                score += boosts[position]
+            elif score < SIMILARITY_THRESHOLD:
+                continue
+            scored.append((score, entry))
+
+        scored.sort(key=lambda item: (-item[0], len(item[1].name), item[1].name))
+        return scored[:limit]
+
+class TrigramMatch(Func):
+    """
+    `UPPER(expression) % UPPER(query)`, which can use the trigram indexes.
+    """
+    template = 'UPPER(%(expressions)s)'
+    arg_joiner = ') %% UPPER('
+    output_field = BooleanField()
+
+class MemorySearchBackend:
+    """
+    Searches the in-process NameIndex, rebuilding it after data changes.
+    """
+
+    def __init__(self):
+        self.index = VersionedIndex(NameIndex.build)
+
+    def get_index(self):
+        return self.index.get()
+
+    def search(self, query, kinds=SEARCH_KINDS, limit=10):
+        return [
+            {'type': entry.kind, 'id': entry.id, 'name': entry.name, 'score': round(score, 4)}
+            for score, entry in self.get_index().search(query, kinds, limit)
+        ]
+
+class TrigramSearchBackend:
+    """
+    Searches with pg_trgm on Postgres, ranked the same way as the in-process
+    index.
+    """
+
+    def search(self, query, kinds=SEARCH_KINDS, limit=10):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        if not normalize(query):
+            return []
+        rank = Case(
+            When(name__iexact=query, then=Value(float(EXACT_BOOST))),
+            When(name__istartswith=query, then=Value(float(PREFIX_BOOST))),
+            When(name__icontains=f' {query}', then=Value(float(WORD_PREFIX_BOOST))),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ) + TrigramSimilarity(Upper('name'), query.upper())
+
+        results = []
+        for kind, model in (('pokemon', Pokemon), ('move', Move)):
+            if kind not in kinds:
+                continue
+            rows = (
+                model.objects
+                .filter(
+                    TrigramMatch(F('name'), Value(query))
+                    | Q(name__istartswith=query)
+                    | Q(name__icontains=f' {query}')
+                )
+                .annotate(score=rank)
+                .values_list('id', 'name', 'score')
+                .order_by('-score', Length('name'), 'name')[:limit]
+            )
+            results += [
+                {'type': kind, 'id': pk, 'name': name, 'score': round(score, 4)}
+                for pk, name, score in rows
+            ]
+
+        results.sort(key=lambda item: (-item['score'], len(item['name']), item['name']))
+        return results[:limit]
+
+BACKENDS = {
+    'memory': MemorySearchBackend,
+    'trigram': TrigramSearchBackend,
+}
+
+_backends = {}
+
+def _get_backend(name):
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+def get_search_backend():
+    return _get_backend(getattr(settings, 'POKEDEX_SEARCH_BACKEND', 'memory'))
+
+def autocomplete(query, kind='pokemon', limit=10):
+    """
+    Returns compact {id, name[, sprite]} dicts for the names starting with
+    query, from the in-process index regardless of the search backend.
+    """
+    results = []
+    for entry in _get_backend('memory').get_index().complete(query, (kind,), limit):
+        item = {'id': entry.id, 'name': entry.name}
+        if entry.sprite:
+            item['sprite'] = entry.sprite
+        results.append(item)
+    return results
@@ -1,12 +1,141 @@
+from collections import Counter
+
+from django.db.models import Q
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Pokemon, Move
+from rest_framework.validators import UniqueValidator
+from .models import DERIVED_STAT_FIELDS, DERIVED_STAT_SOURCES, MAX_ID, MIN_ID, Pokemon, Move
+
+class SparseFieldsMixin:
+    """
+    Allows a serializer to be narrowed to a subset of its fields by passing
+    a `fields` keyword argument, e.g. for `?fields=` projections.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
 
-class MoveSerializer(serializers.ModelSerializer):
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+class MoveSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Move
         fields = ['id', 'name', 'description', 'type', 'power', 'effect', 'category', 'accuracy']
 
-class PokemonSerializer(serializers.ModelSerializer):
+class PokemonListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Lightweight Pokemon representation used by list endpoints.
+    """
+    class Meta:
+        model = Pokemon
+        fields = ['id', 'name', 'sprite', 'type_1', 'type_2']
+
+class PokemonBulkSerializer(serializers.ListSerializer):
+    """
+    Validates and writes lists of Pokemon for the bulk endpoint.
+
+    Name uniqueness and move ids are checked for the whole list with one
+    query each, and rows and learnsets are written with bulk statements.
+    Updates expect an `id` in every item.
+    """
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+
+        if not hasattr(self, '_instances'):
+            self._instances = {instance.id: instance for instance in self.instance}
+        pk = data.get('id') if isinstance(data, dict) else None
+        if pk is None:
+            raise serializers.ValidationError({'id': ['This field is required.']})
+        if pk not in self._instances:
+            raise serializers.ValidationError({'id': [f'Pokemon {pk} does not exist.']})
+
+        self.child.instance = self._instances[pk]
+        self.child.initial_data = data
+        validated = super().run_child_validation(data)
+        validated['id'] = pk
+        return validated
+
+    def to_internal_value(self, data):
+        validated_data = super().to_internal_value(data)
+        errors = [{} for _ in validated_data]
+
+        ids = Counter(item['id'] for item in validated_data if 'id' in item)
+        names = Counter(item['name'] for item in validated_data if 'name' in item)
+        renamed_ids = [item['id'] for item in validated_data if 'id' in item and 'name' in item]
+        taken = set(
+            Pokemon.objects.filter(name__in=names).exclude(id__in=renamed_ids)
+            .values_list('name', flat=True)
+        )
+
+        move_ids = {pk for item in validated_data for pk in item.get('move_ids', [])}
+        known_move_ids = set(Move.objects.filter(id__in=move_ids).values_list('id', flat=True))
+
+        for item, item_errors in zip(validated_data, errors):
+            if ids.get(item.get('id'), 0) > 1:
+                item_errors['id'] = ['Duplicate id in this request.']
+            if 'name' in item and names[item['name']] > 1:
+                item_errors['name'] = ['Duplicate name in this request.']
+            elif item.get('name') in taken:
+                item_errors['name'] = ['pokemon with this name already exists.']
+            unknown = [pk for pk in item.get('move_ids', []) if pk not in known_move_ids]
+            if unknown:
+                item_errors['move_ids'] = [f'Unknown move ids: {unknown}']
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return validated_data
+
+    def create(self, validated_data):
+        move_ids = [item.pop('move_ids', None) for item in validated_data]
+        pokemon = [Pokemon(**item) for item in validated_data]
+        for obj in pokemon:
+            obj.update_derived_stats()
+        pokemon = Pokemon.objects.bulk_create(pokemon)
+        self.set_learnsets(zip(pokemon, move_ids))
+        return pokemon
+
+    def update(self, instance, validated_data):
+        instances = {obj.id: obj for obj in instance}
+        now = timezone.now()
+        fields = {'updated_at'}
+        pokemon = []
+        learnsets = []
+
+        for item in validated_data:
+            obj = instances[item.pop('id')]
+            move_ids = item.pop('move_ids', None)
+            for attr, value in item.items():
+                setattr(obj, attr, value)
+            obj.updated_at = now
+            fields.update(item)
+            if DERIVED_STAT_SOURCES & set(item):
+                obj.update_derived_stats()
+                fields.update(DERIVED_STAT_FIELDS)
+            pokemon.append(obj)
+            learnsets.append((obj, move_ids))
+
+        Pokemon.objects.bulk_update(pokemon, fields)
+        self.set_learnsets(learnsets)
+        return pokemon
+
+    def set_learnsets(self, learnsets):
+        """
+        Replaces the moves of each (pokemon, move_ids) pair whose move_ids
+        is not None, with one DELETE and one bulk INSERT.
+        """
+        through = Pokemon.moves.through
+        learnsets = [(pokemon, move_ids) for pokemon, move_ids in learnsets if move_ids is not None]
+        through.objects.filter(pokemon_id__in=[pokemon.id for pokemon, _ in learnsets]).delete()
+        through.objects.bulk_create([
+            through(pokemon_id=pokemon.id, move_id=move_id)
+            for pokemon, move_ids in learnsets
+            for move_id in dict.fromkeys(move_ids)
+        ])
+
+class PokemonSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     moves = MoveSerializer(many=True, read_only=True)
     move_ids = serializers.ListField(
         child=serializers.IntegerField(),
@@ -17,7 +146,19 @@ class PokemonSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pokemon
         fields = ['id', 'name', 'sprite', 'type_1', 'type_2', 'hp', 'attack', 
-                  'defense', 'sp_atk', 'sp_def', 'speed', 'height', 'weight', 'moves', 'move_ids']
+                  'defense', 'sp_atk', 'sp_def', 'speed', 'height', 'weight',
+                  'base_stat_total', 'physical_bulk', 'special_bulk', 'bmi', 'moves', 'move_ids']
+        list_serializer_class = PokemonBulkSerializer
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if isinstance(self.parent, PokemonBulkSerializer) and 'name' in fields:
+            # Uniqueness is checked once for the whole list
+            fields['name'].validators = [
+                validator for validator in fields['name'].validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+        return fields
     
     def to_internal_value(self, data):
         # If 'moves' is in the request data and it's a list of IDs, 
@@ -54,3 +195,202 @@ class PokemonSerializer(serializers.ModelSerializer):
             instance.moves.set(moves)
         
         return instance
+
+class BatchGetSerializer(serializers.Serializer):
+    """
+    Validates the body of batch-get requests: a list of ids and/or names.
+    """
+    MAX_ITEMS = 100
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=MIN_ID, max_value=MAX_ID),
+        required=False, max_length=MAX_ITEMS,
+    )
+    names = serializers.ListField(
+        child=serializers.CharField(), required=False, max_length=MAX_ITEMS
+    )
+
+    def validate(self, attrs):
+        if not attrs.get('ids') and not attrs.get('names'):
+            raise serializers.ValidationError('Provide a list of ids and/or names.')
+        if len(attrs.get('ids', [])) + len(attrs.get('names', [])) > self.MAX_ITEMS:
+            raise serializers.ValidationError(f'At most {self.MAX_ITEMS} items can be fetched at once.')
+        return attrs
+
+class LearnsetPairSerializer(serializers.Serializer):
+    pokemon = serializers.IntegerField()
+    move = serializers.IntegerField()
+
+class LearnsetRuleSerializer(serializers.Serializer):
+    """
+    Selects every Pokemon with the given type as either its primary or
+    secondary type, e.g. "give these moves to all Fire types". Types are
+    accepted in any case and normalized to the spelling Pokemon types are
+    stored with, so rules can use the types index.
+    """
+    type = serializers.CharField()
+    moves = serializers.ListField(child=serializers.IntegerField(), min_length=1)
+
+    def validate_type(self, value):
+        types = dict(Move.MOVE_TYPES)
+        if value.lower() not in types:
+            raise serializers.ValidationError(f'Unknown type: {value!r}')
+        return types[value.lower()]
+
+    @staticmethod
+    def select_pokemon(rule):
+        return Pokemon.objects.filter(Q(type_1=rule['type']) | Q(type_2=rule['type']))
+
+class LearnsetEditSerializer(serializers.Serializer):
+    """
+    Applies learnset additions and removals directly to the Pokemon-Move
+    through table with set-based statements.
+    """
+    add = LearnsetPairSerializer(many=True, required=False)
+    remove = LearnsetPairSerializer(many=True, required=False)
+    add_by_type = LearnsetRuleSerializer(many=True, required=False)
+    remove_by_type = LearnsetRuleSerializer(many=True, required=False)
+
+    def validate(self, attrs):
+        if not any(attrs.get(key) for key in self.fields):
+            raise serializers.ValidationError('Provide at least one learnset change.')
+
+        pairs = attrs.get('add', []) + attrs.get('remove', [])
+        rules = attrs.get('add_by_type', []) + attrs.get('remove_by_type', [])
+        pokemon_ids = {pair['pokemon'] for pair in pairs}
+        move_ids = {pair['move'] for pair in pairs} | {pk for rule in rules for pk in rule['moves']}
+
+        unknown_pokemon = pokemon_ids - set(
+            Pokemon.objects.filter(id__in=pokemon_ids).values_list('id', flat=True)
+        )
+        unknown_moves = move_ids - set(Move.objects.filter(id__in=move_ids).values_list('id', flat=True))
+        errors = {}
+        if unknown_pokemon:
+            errors['pokemon'] = [f'Unknown Pokemon ids: {sorted(unknown_pokemon)}']
+        if unknown_moves:
+            errors['moves'] = [f'Unknown move ids: {sorted(unknown_moves)}']
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        through = Pokemon.moves.through
+        added = removed = 0
+        touched = set()
+
+        # Removals first, so a pair both removed and added ends up learned
+        removals = {}
+        for pair in validated_data.get('remove', []):
+            removals.setdefault(pair['move'], set()).add(pair['pokemon'])
+        if removals:
+            condition = Q()
+            for move_id, pokemon_ids in removals.items():
+                condition |= Q(move_id=move_id, pokemon_id__in=pokemon_ids)
+                touched.update(pokemon_ids)
+            removed += through.objects.filter(condition).delete()[0]
+
+        for rule in validated_data.get('remove_by_type', []):
+            pokemon = LearnsetRuleSerializer.select_pokemon(rule)
+            rows = through.objects.filter(move_id__in=rule['moves'], pokemon__in=pokemon)
+            touched.update(rows.values_list('pokemon_id', flat=True).distinct())
+            removed += rows.delete()[0]
+
+        pairs = {(pair['pokemon'], pair['move']) for pair in validated_data.get('add', [])}
+        for rule in validated_data.get('add_by_type', []):
+            pokemon_ids = LearnsetRuleSerializer.select_pokemon(rule).values_list('id', flat=True)
+            pairs.update((pokemon_id, move_id) for pokemon_id in pokemon_ids for move_id in rule['moves'])
+
+        if pairs:
+            pokemon_ids = {pokemon_id for pokemon_id, _ in pairs}
+            move_ids = {move_id for _, move_id in pairs}
+            existing = set(
+                through.objects.filter(pokemon_id__in=pokemon_ids, move_id__in=move_ids)
+                .values_list('pokemon_id', 'move_id')
+            )
+            new_pairs = pairs - existing
+            through.objects.bulk_create(
+                [through(pokemon_id=pokemon_id, move_id=move_id) for pokemon_id, move_id in new_pairs],
+                ignore_conflicts=True,
+            )
+            added += len(new_pairs)
+            touched.update(pokemon_id for pokemon_id, _ in new_pairs)
+
+        Pokemon.objects.filter(id__in=touched).update(updated_at=timezone.now())
+        return {'added': added, 'removed': removed, 'pokemon_updated': len(touched)}
+
+class DamageRequestSerializer(serializers.Serializer):
+    """
+    Validates the body of damage calculation requests: the attacker,
+    defender and move ids spanning the grid.
+    """
+    MAX_ITEMS = 2000
+    MAX_CELLS = 10_000_000
+
+    attackers = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1, max_length=MAX_ITEMS
+    )
+    defenders = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1, max_length=MAX_ITEMS
+    )
+    moves = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1, max_length=MAX_ITEMS
+    )
+    level = serializers.IntegerField(min_value=1, max_value=100, default=50)
+    expected = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        cells = len(attrs['attackers']) * len(attrs['defenders']) * len(attrs['moves'])
+        if cells > self.MAX_CELLS:
+            raise serializers.ValidationError(
+                f'The grid has {cells} cells, at most {self.MAX_CELLS} can be computed at once.'
+            )
+        return attrs
+
+class SimilarRequestSerializer(serializers.Serializer):
+    """
+    Validates similarity queries: how many neighbours to return and how to
+    measure distance, plus the Pokemon ids for batched queries.
+    """
+    MAX_ITEMS = 100
+    MAX_K = 100
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1, max_length=MAX_ITEMS
+    )
+    k = serializers.IntegerField(min_value=1, max_value=MAX_K, default=10)
+    metric = serializers.ChoiceField(choices=['cosine', 'euclidean'], default='cosine')
+
+class TeamRequestSerializer(serializers.Serializer):
+    """
+    Validates team optimizer requests: the team size, the Pokemon to build
+    around or leave out, and the search limits.
+    """
+    MAX_SIZE = 6
+    MAX_ITEMS = 2000
+
+    size = serializers.IntegerField(min_value=1, max_value=MAX_SIZE, default=MAX_SIZE)
+    include = serializers.ListField(
+        child=serializers.IntegerField(), max_length=MAX_SIZE, default=list
+    )
+    exclude = serializers.ListField(
+        child=serializers.IntegerField(), max_length=MAX_ITEMS, default=list
+    )
+    pool = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1, max_length=MAX_ITEMS, required=False
+    )
+    min_base_stat_total = serializers.IntegerField(min_value=0, required=False)
+    beam_width = serializers.IntegerField(min_value=1, max_value=1024, default=64)
+    results = serializers.IntegerField(min_value=1, max_value=20, default=5)
+    time_budget = serializers.FloatField(min_value=0.01, max_value=10, default=2.0)
+
+    def validate(self, attrs):
+        include = set(attrs['include'])
+        if len(include) > attrs['size']:
+            raise serializers.ValidationError(
+                {'include': [f'At most {attrs["size"]} Pokemon fit in the team.']}
+            )
+        if include & set(attrs['exclude']):
+            raise serializers.ValidationError(
+                {'exclude': ['Pokemon cannot be both included and excluded.']}
+            )
+        return attrs
@@ -0,0 +1,54 @@
+"""
+Signal handlers that keep modification timestamps current and invalidate
+cached responses when Pokedex data changes.
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_data_version
+from .models import Pokemon, Move
+
+def invalidate():
+    """
+    Bumps the data version now, so the writing transaction reads its own
+    writes, and again once the transaction commits, so responses and
+    indexes built by concurrent readers from the pre-commit data are
+    discarded too.
+    """
+    bump_data_version()
+    transaction.on_commit(bump_data_version)
+
+@receiver(post_save, sender=Pokemon)
+@receiver(post_save, sender=Move)
+@receiver(post_delete, sender=Pokemon)
+@receiver(post_delete, sender=Move)
+def invalidate_on_write(sender, **kwargs):
+    invalidate()
+
+@receiver(m2m_changed, sender=Pokemon.moves.through)
+def invalidate_on_learnset_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate()
+
+# Pokemon representations embed their moves, so a Pokemon is considered
+# modified whenever its learnset or one of its moves changes.
+
+@receiver(m2m_changed, sender=Pokemon.moves.through)
+def touch_pokemon_on_learnset_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        pokemon = Pokemon.objects.filter(pk=instance.pk)
+    elif pk_set:
+        pokemon = Pokemon.objects.filter(pk__in=pk_set)
+    else:
+        pokemon = Pokemon.objects.filter(moves=instance)
+    pokemon.update(updated_at=timezone.now())
+
+@receiver(post_save, sender=Move)
+@receiver(pre_delete, sender=Move)
+def touch_pokemon_on_move_change(sender, instance, **kwargs):
+    Pokemon.objects.filter(moves=instance).update(updated_at=timezone.now())
@@ -0,0 +1,129 @@
+"""
+Nearest-neighbour search over Pokemon stat spreads and types.
+
+Each Pokemon is a row of a contiguous float32 matrix: its six base stats
+scaled by MAX_STAT, followed by a one-hot encoding of its types scaled by
+TYPE_WEIGHT. Neighbours are ranked by cosine similarity or Euclidean
+distance computed with one matrix-vector (or matrix-matrix, for batches)
+product over every row, then selected with argpartition.
+
+The index is rebuilt on first use after the data version changes.
+"""
+
+import numpy as np
+
+from .cache import VersionedIndex
+from .models import STAT_FIELDS, Pokemon
+from .typechart import NO_TYPE, TYPES, type_index
+
+METRICS = ('cosine', 'euclidean')
+MAX_STAT = 255.0
+# A differing type weighs about as much as a 64 point stat difference
+TYPE_WEIGHT = 0.25
+
+# Upper bound on the (rows x queries) score matrix computed at once
+MAX_BATCH_CELLS = 16_000_000
+
+class SimilarityIndex:
+    """
+    Feature matrix of a set of Pokemon, with their ids and names in row
+    order.
+    """
+
+    def __init__(self, ids, stats, type_1, type_2, names=None, version=None):
+        self.version = version
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.names = names
+        self.positions = {pk: i for i, pk in enumerate(self.ids.tolist())}
+
+        count = len(self.ids)
+        features = np.zeros((count, len(STAT_FIELDS) + len(TYPES) + 1), dtype=np.float32)
+        features[:, :len(STAT_FIELDS)] = np.asarray(stats, dtype=np.float32) / MAX_STAT
+        rows = np.arange(count)
+        offset = len(STAT_FIELDS)
+        features[rows, offset + np.asarray(type_1, dtype=np.intp)] = TYPE_WEIGHT
+        features[rows, offset + np.asarray(type_2, dtype=np.intp)] = TYPE_WEIGHT
+        # Drop the column collecting missing and unknown types
+        self.matrix = np.ascontiguousarray(features[:, :-1])
+        self.squared_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self.norms = np.sqrt(self.squared_norms)
+        self.norms[self.norms == 0] = 1
+
+    @classmethod
+    def build(cls, version=None):
+        rows = list(Pokemon.objects.order_by('id').values_list('id', 'name', 'type_1', 'type_2', *STAT_FIELDS))
+        type_1 = [type_index(row[2]) for row in rows]
+        type_2 = [type_index(row[3]) for row in rows]
+        type_2 = [NO_TYPE if second == first else second for first, second in zip(type_1, type_2)]
+        stats = np.array([row[4:] for row in rows], dtype=np.float32).reshape(len(rows), len(STAT_FIELDS))
+        return cls([row[0] for row in rows], stats, type_1, type_2, [row[1] for row in rows], version)
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes + self.squared_norms.nbytes + self.norms.nbytes + self.ids.nbytes
+
+    def scores(self, positions, metric):
+        """
+        Returns a (len(positions), rows) array of scores against every row,
+        where lower is always closer: negated cosine similarity or squared
+        Euclidean distance.
+        """
+        queries = self.matrix[positions]
+        dots = queries @ self.matrix.T
+        if metric == 'cosine':
+            return -dots / (self.norms[positions, None] * self.norms[None, :])
+        distances = self.squared_norms[positions, None] - 2 * dots + self.squared_norms[None, :]
+        return np.maximum(distances, 0)
+
+    def neighbors(self, positions, k=10, metric='cosine'):
+        """
+        Returns (neighbor positions, scores) arrays of shape (len(positions), k)
+        for the rows at positions, excluding the rows themselves, closest
+        first. Scores are cosine similarities or Euclidean distances.
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        k = min(k, len(self.ids) - 1)
+        if k <= 0 or not len(positions):
+            empty = np.empty((len(positions), 0))
+            return empty.astype(np.intp), empty
+
+        step = max(MAX_BATCH_CELLS // max(len(self.ids), 1), 1)
+        neighbor_chunks, score_chunks = [], []
+        for start in range(0, len(positions), step):
+            chunk = positions[start:start + step]
+            scores = self.scores(chunk, metric)
+            scores[np.arange(len(chunk)), chunk] = np.inf
+
+            candidates = np.argpartition(scores, k - 1, axis=1)[:, :k]
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            order = np.argsort(candidate_scores, axis=1, kind='stable')
+            neighbor_chunks.append(np.take_along_axis(candidates, order, axis=1))
+            score_chunks.append(np.take_along_axis(candidate_scores, order, axis=1))
+
+        neighbors = np.concatenate(neighbor_chunks)
+        scores = np.concatenate(score_chunks)
+        scores = -scores if metric == 'cosine' else np.sqrt(scores)
+        return neighbors, scores
+
+    def similar(self, ids, k=10, metric='cosine'):
+        """
+        Returns {id, similar} dicts for the given ids that exist, where
+        similar lists the k closest Pokemon as {id, name, score} dicts.
+        """
+        ids = [pk for pk in ids if pk in self.positions]
+        neighbors, scores = self.neighbors([self.positions[pk] for pk in ids], k, metric)
+        return [
+            {
+                'id': pk,
+                'similar': [
+                    {'id': int(self.ids[i]), 'name': self.names[i], 'score': round(float(score), 4)}
+                    for i, score in zip(row.tolist(), row_scores.tolist())
+                ],
+            }
+            for pk, row, row_scores in zip(ids, neighbors, scores)
+        ]
+
+_similarity_index = VersionedIndex(SimilarityIndex.build)
+
+def get_similarity_index():
+    return _similarity_index.get()
@@ -0,0 +1,176 @@
+"""
+Team coverage optimizer.
+
+Each Pokemon gets a 36-bit coverage mask: bit t is set when one of the
+damaging moves it learns is super effective against type t, and bit 18 + t
+when it resists (or is immune to) attacks of type t. A team's coverage is
+the number of bits set in the OR of its members' masks, so a team that hits
+every type super effectively and resists every type scores 36. Ties are
+broken by the team's total base stats.
+
+Teams are found with a beam search (see teamsearch.py) over the candidates
+left after pruning those that can never improve a team. Large candidate
+pools are split across worker processes by first pick.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.conf import settings
+
+from .cache import VersionedIndex
+from .models import Pokemon
+from .teamsearch import beam_search, popcount, prune_pool
+from .typechart import CHART, DEFENSIVE, NO_TYPE, TYPES, type_index
+
+TEAM_SIZE = 6
+FULL_COVERAGE = 2 * len(TYPES)
+
+_bits = np.uint64(1) << np.arange(len(TYPES), dtype=np.uint64)
+# Attacking type -> mask of the defending types it is super effective against
+SUPER_EFFECTIVE_MASKS = ((CHART > 1).astype(np.uint64) * _bits).sum(axis=1, dtype=np.uint64)
+
+def type_names(mask, offset=0):
+    return [name for i, name in enumerate(TYPES) if int(mask) >> (offset + i) & 1]
+
+class TeamIndex:
+    """
+    Coverage masks and base stat totals of every Pokemon, aligned with the
+    `ids` and `names` arrays and ordered by id.
+    """
+
+    def __init__(self, rows, learnsets, version=None):
+        self.version = version
+        rows = list(rows)
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.names = [row[1] for row in rows]
+        self.positions = {pk: i for i, pk in enumerate(self.ids.tolist())}
+        self.totals = np.array([row[4] for row in rows], dtype=np.int64)
+
+        offense = np.zeros(len(rows), dtype=np.uint64)
+        for pokemon_id, move_type in learnsets:
+            move_type = type_index(move_type)
+            if pokemon_id in self.positions and move_type < NO_TYPE:
+                offense[self.positions[pokemon_id]] |= SUPER_EFFECTIVE_MASKS[move_type]
+
+        first = np.array([type_index(row[2]) for row in rows], dtype=np.intp)
+        second = np.array([type_index(row[3]) for row in rows], dtype=np.intp)
+        second[second == first] = NO_TYPE
+        resisted = DEFENSIVE[:, first, second].T < 1
+        defense = (resisted.astype(np.uint64) * _bits).sum(axis=1, dtype=np.uint64)
+        self.masks = offense | (defense << np.uint64(len(TYPES)))
+
+    @classmethod
+    def build(cls, version=None):
+        rows = Pokemon.objects.order_by('id').values_list(
+            'id', 'name', 'type_1', 'type_2', 'base_stat_total'
+        )
+        learnsets = (
+            Pokemon.moves.through.objects
+            .filter(move__power__gt=0)
+            .exclude(move__category='status')
+            .values_list('pokemon_id', 'move__type')
+            .distinct()
+        )
+        return cls(rows, learnsets, version)
+
+    def missing(self, ids):
+        return [pk for pk in ids if pk not in self.positions]
+
+    def describe(self, positions):
+        mask = np.bitwise_or.reduce(self.masks[positions]) if len(positions) else 0
+        return {
+            'pokemon': [{'id': int(self.ids[i]), 'name': self.names[i]} for i in positions],
+            'coverage': int(popcount(mask)),
+            'super_effective': type_names(mask),
+            'resisted': type_names(mask, len(TYPES)),
+            'base_stat_total': int(self.totals[positions].sum()),
+        }
+
+_team_index = VersionedIndex(TeamIndex.build)
+
+def get_team_index():
+    return _team_index.get()
+
+def team_workers(pool_size):
+    """
+    Returns how many processes should search a pool of candidates.
+    """
+    if pool_size < getattr(settings, 'POKEDEX_TEAM_PARALLEL_POOL', 5000):
+        return 1
+    workers = getattr(settings, 'POKEDEX_TEAM_WORKERS', None) or os.cpu_count() or 1
+    return max(min(workers, pool_size), 1)
+
+def search(masks, totals, slots, seed_mask, seed_total, beam_width, results, deadline):
+    """
+    Runs the beam search over the candidates, fanned out across worker
+    processes by first pick for large pools.
+
+    Returns (teams, scores, timed_out) like beam_search.
+    """
+    arguments = (masks, totals, slots, seed_mask, seed_total, beam_width, results, deadline)
+    workers = team_workers(len(masks))
+    if workers == 1 or slots == 0:
+        return beam_search(*arguments)
+
+    shards = np.array_split(np.arange(len(masks)), workers)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        outcomes = list(executor.map(beam_search, *zip(*[arguments + (shard,) for shard in shards])))
+
+    teams = np.concatenate([outcome[0] for outcome in outcomes])
+    scores = np.concatenate([outcome[1] for outcome in outcomes])
+    # Workers can reach the same team from different first picks
+    seen = set()
+    order = []
+    for i in np.argsort(-scores, kind='stable').tolist():
+        members = tuple(teams[i].tolist())
+        if members not in seen and len(order) < results:
+            seen.add(members)
+            order.append(i)
+    return teams[order], scores[order], any(outcome[2] for outcome in outcomes)
+
+def optimize(size=TEAM_SIZE, include=(), exclude=(), pool=None, min_base_stat_total=None,
+             beam_width=64, results=5, time_budget=2.0):
+    """
+    Returns the best teams of `size` Pokemon found within time_budget
+    seconds, along with whether the search ran out of time.
+
+    Teams always contain the Pokemon in `include` and draw the rest from
+    `pool` (every Pokemon by default), leaving out those in `exclude` or
+    with fewer than min_base_stat_total base stats. Unknown ids are ignored.
+    """
+    deadline = time.time() + time_budget
+    index = get_team_index()
+    include = list(dict.fromkeys(index.positions[pk] for pk in include if pk in index.positions))
+
+    candidates = np.ones(len(index.ids), dtype=bool)
+    if pool is not None:
+        candidates[:] = False
+        candidates[[index.positions[pk] for pk in pool if pk in index.positions]] = True
+    candidates[[index.positions[pk] for pk in exclude if pk in index.positions]] = False
+    candidates[include] = False
+    if min_base_stat_total is not None:
+        candidates &= index.totals >= min_base_stat_total
+    candidates = np.flatnonzero(candidates)
+
+    slots = max(size - len(include), 0)
+    candidates = candidates[prune_pool(index.masks[candidates], index.totals[candidates], slots)]
+    seed_mask = np.bitwise_or.reduce(index.masks[include]) if include else np.uint64(0)
+    seed_total = int(index.totals[include].sum())
+
+    teams, _, timed_out = search(
+        index.masks[candidates], index.totals[candidates], slots,
+        seed_mask, seed_total, beam_width, results, deadline,
+    )
+    return {
+        'teams': [
+            index.describe(include + candidates[team].tolist()) for team in teams
+        ],
+        'max_coverage': FULL_COVERAGE,
+        'candidates': len(candidates),
+        'timed_out': timed_out,
+    }
@@ -0,0 +1,147 @@
+"""
+Beam search over candidate coverage masks for the team optimizer.
+
+Candidates are positions into two aligned arrays: a uint64 coverage mask and
+an integer total used to break ties. A team scores the number of bits set in
+the OR of its members' masks, then the sum of their totals.
+
+This module only depends on NumPy so the search can run in worker
+processes without setting up Django.
+"""
+
+import time
+
+import numpy as np
+
+# Coverage always outweighs the totals, which stay well below this
+TOTAL_SCALE = 1 << 20
+# Upper bound on the (teams x candidates) children scored at once
+MAX_CELLS = 4_000_000
+# Upper bound on the (candidates x candidates) pairs checked for dominance
+DOMINANCE_CELLS = 64_000_000
+
+_POPCOUNT_16 = np.zeros(1 << 16, dtype=np.int64)
+for _bit in range(16):
+    _POPCOUNT_16 += (np.arange(1 << 16) >> _bit) & 1
+
+def popcount(masks):
+    """Returns the number of bits set in each value of a uint64 array"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    counts = np.zeros(masks.shape, dtype=np.int64)
+    for shift in range(0, 64, 16):
+        counts += _POPCOUNT_16[((masks >> np.uint64(shift)) & np.uint64(0xFFFF)).astype(np.intp)]
+    return counts
+
+def prune_pool(masks, totals, slots):
+    """
+    Returns the positions of the candidates worth searching when `slots`
+    team members remain to be picked, in descending total order.
+
+    A candidate is dropped when at least `slots` candidates ahead of it bring
+    all of its coverage: any team using it can swap it for one of them that
+    is not in the team yet without scoring lower. Candidates sharing a mask
+    are cut to the best `slots`, then every candidate is checked against as
+    many leading candidates as DOMINANCE_CELLS allows.
+    """
+    if not len(masks):
+        return np.zeros(0, dtype=np.intp)
+    order = np.lexsort((-totals, masks))
+    sorted_masks = masks[order]
+    starts = np.r_[True, sorted_masks[1:] != sorted_masks[:-1]]
+    group_starts = np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))
+    keep = order[np.arange(len(order)) - group_starts < slots]
+    keep = keep[np.argsort(-totals[keep], kind='stable')]
+    if not len(keep):
+        return keep
+
+    leaders = min(len(keep), max(DOMINANCE_CELLS // len(keep), slots))
+    return keep[undominated(masks[keep], slots, leaders)]
+
+def undominated(masks, slots, leaders, block=256):
+    """
+    Returns a boolean array of the candidates, in descending total order,
+    covered by fewer than `slots` earlier candidates among the first
+    `leaders`. Ignoring later dominators only keeps more candidates.
+    """
+    count = len(masks)
+    index = np.arange(count)
+    dominators = np.zeros(count, dtype=np.int64)
+    for start in range(0, leaders, block):
+        rows = slice(start, min(start + block, leaders))
+        # [i, j]: candidate i brings every bit of candidate j and ranks ahead of it
+        covers = (masks[None, :] & ~masks[rows, None]) == 0
+        dominators += (covers & (index[rows, None] < index[None, :])).sum(axis=0)
+    return dominators < slots
+
+def beam_search(masks, totals, size, seed_mask=0, seed_total=0, beam_width=64, results=5,
+                deadline=None, first_picks=None):
+    """
+    Searches for the best teams of `size` candidates, adding one member at a
+    time and keeping the `beam_width` best distinct partial teams.
+
+    seed_mask and seed_total account for members already on the team.
+    first_picks restricts the first member to some candidates, so the search
+    can be split across processes. Once time.time() passes deadline, the
+    remaining members are picked greedily.
+
+    Returns (teams, scores, timed_out), where teams is an array of up to
+    `results` rows of candidate positions, best first.
+    """
+    size = min(size, len(masks))
+    teams = np.zeros((1, 0), dtype=np.intp)
+    team_masks = np.array([seed_mask], dtype=np.uint64)
+    team_totals = np.array([seed_total], dtype=np.int64)
+    scores = popcount(team_masks) * TOTAL_SCALE + team_totals
+    timed_out = False
+
+    for depth in range(size):
+        last = depth == size - 1
+        width = results if last else (1 if timed_out else beam_width)
+        # The same team can be reached from each of its depth + 1 parents
+        limit = width * (depth + 1)
+        candidates = np.arange(len(masks)) if first_picks is None or depth else first_picks
+        step = max(MAX_CELLS // len(teams), 1)
+
+        best_scores, best_parents, best_picks = [], [], []
+        for start in range(0, len(candidates), step):
+            chunk = candidates[start:start + step]
+            child_scores = (
+                popcount(team_masks[:, None] | masks[chunk][None, :]) * TOTAL_SCALE
+                + team_totals[:, None] + totals[chunk][None, :]
+            )
+            child_scores[(teams[:, :, None] == chunk[None, None, :]).any(axis=1)] = -1
+
+            flat = child_scores.ravel()
+            top = np.argpartition(-flat, limit - 1)[:limit] if len(flat) > limit else np.arange(len(flat))
+            parents, picks = np.divmod(top, len(chunk))
+            best_scores.append(flat[top])
+            best_parents.append(parents)
+            best_picks.append(chunk[picks])
+
+            if deadline is not None and time.time() > deadline:
+                timed_out = True
+                break
+
+        child_scores = np.concatenate(best_scores)
+        parents = np.concatenate(best_parents)
+        picks = np.concatenate(best_picks)
+
+        seen = set()
+        selected = []
+        for i in np.argsort(-child_scores, kind='stable').tolist():
+            if child_scores[i] < 0 or len(selected) == width:
+                break
+            members = tuple(sorted(teams[parents[i]].tolist() + [int(picks[i])]))
+            if members not in seen:
+                seen.add(members)
+                selected.append(i)
+        if not selected:
+            break
+
+        selected = np.array(selected, dtype=np.intp)
+        teams = np.sort(np.column_stack([teams[parents[selected]], picks[selected]]), axis=1)
+        team_masks = team_masks[parents[selected]] | masks[picks[selected]]
+        team_totals = team_totals[parents[selected]] + totals[picks[selected]]
+        scores = child_scores[selected]
+
+    return teams, scores, timed_out
@@ -1,3 +1,1339 @@
-from django.test import TestCase
+import base64
+import itertools
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import BooleanField, F
+from django.db.models.expressions import RawSQL
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import damage, learnsets, loaders, similarity, teams, teamsearch, typechart
+from .cache import get_cache, get_data_version
+from .models import DataVersion, Pokemon, Move
+
+
+def make_move(name, **kwargs):
+    defaults = {
+        'description': f'{name} - A test move.',
+        'type': 'normal',
+        'power': 40,
+        'category': 'physical',
+        'accuracy': 100,
+    }
+    defaults.update(kwargs)
+    return Move.objects.create(name=name, **defaults)
+
+
+def make_pokemon(name, **kwargs):
+    defaults = {
+        'type_1': 'Normal',
+        'hp': 50,
+        'attack': 50,
+        'defense': 50,
+        'sp_atk': 50,
+        'sp_def': 50,
+        'speed': 50,
+    }
+    defaults.update(kwargs)
+    return Pokemon.objects.create(name=name, **defaults)
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        get_cache().clear()
+
+
+class PokemonQueryCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        moves = [make_move(f'Move {i}') for i in range(3)]
+        for i in range(30):
+            pokemon = make_pokemon(f'Pokemon {i}')
+            pokemon.moves.set(moves)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_does_not_scale_with_page_size(self):
+        # 25 rows on the first page, 5 on the second
+        full_page = self.count_queries('/api/pokemon/?expand=moves')
+        short_page = self.count_queries('/api/pokemon/?expand=moves&page=2')
+        self.assertEqual(full_page, short_page)
+
+    def test_retrieve_prefetches_moves(self):
+        pokemon = Pokemon.objects.first()
+        # Validator lookup, the Pokemon itself and its prefetched moves
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/pokemon/{pokemon.id}/')
+        self.assertEqual(len(response.data['moves']), 3)
+
+
+class SparseFieldsetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.move = make_move('Ember', type='fire', category='special')
+        cls.pokemon = make_pokemon('Charmander', type_1='Fire')
+        cls.pokemon.moves.add(cls.move)
+
+    def test_list_uses_slim_representation(self):
+        response = self.client.get('/api/pokemon/')
+        self.assertEqual(
+            set(response.data['results'][0]),
+            {'id', 'name', 'sprite', 'type_1', 'type_2'},
+        )
+
+    def test_list_expand_moves(self):
+        response = self.client.get('/api/pokemon/?expand=moves')
+        self.assertEqual(response.data['results'][0]['moves'][0]['name'], 'Ember')
+
+    def test_fields_projection_narrows_select(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/pokemon/?fields=id,name,speed')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'speed'})
+        select = ctx.captured_queries[-1]['sql']
+        self.assertIn('"speed"', select)
+        self.assertNotIn('"sprite"', select)
+
+    def test_detail_renders_all_fields(self):
+        response = self.client.get(f'/api/pokemon/{self.pokemon.id}/')
+        self.assertIn('hp', response.data)
+        self.assertEqual(len(response.data['moves']), 1)
+
+    def test_move_fields_projection(self):
+        response = self.client.get('/api/moves/?fields=id,name')
+        self.assertEqual(response.data['results'], [{'id': self.move.id, 'name': 'Ember'}])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/pokemon/?fields=name,bogus,nope')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['fields'], ['Unknown fields: bogus, nope'])
+
+
+class IndexUsageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_pokemon('Charmander', type_1='Fire')
+        make_pokemon('Pidgey', type_1='Normal', type_2='Flying')
+        make_move('Ember', type='fire', category='special')
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_name_lookup_uses_unique_index(self):
+        plan = self.explain(Pokemon.objects.filter(name='Pidgey'))
+        self.assertRegex(plan, r'(?i)index')
+
+    def test_type_filters_use_indexes(self):
+        plan = self.explain(Pokemon.objects.filter(type_1='Fire'))
+        self.assertIn('pokemon_types_idx', plan)
+        plan = self.explain(Pokemon.objects.filter(type_2='Flying'))
+        self.assertIn('pokemon_type_2_idx', plan)
+
+    def test_stat_ordering_uses_index(self):
+        plan = self.explain(Pokemon.objects.order_by('-speed')[:25])
+        self.assertIn('pokemon_speed_idx', plan)
+
+    def test_move_filters_use_index(self):
+        plan = self.explain(Move.objects.filter(type='fire', category='special'))
+        self.assertIn('move_type_category_idx', plan)
+
+    def test_base_stat_total_filter_uses_index(self):
+        plan = self.explain(Pokemon.objects.filter(base_stat_total__gte=500))
+        self.assertIn('pokemon_base_stat_total_idx', plan)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'pg_trgm requires Postgres')
+    def test_search_uses_trigram_index(self):
+        plan = self.explain(Pokemon.objects.filter(name__icontains='arm'))
+        self.assertIn('pokemon_name_trgm_idx', plan)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'tsvector requires Postgres')
+    def test_text_search_uses_gin_index(self):
+        match = RawSQL("search_vector @@ plainto_tsquery('english', %s)", ['fire'], output_field=BooleanField())
+        self.assertIn('move_search_vector_idx', self.explain(Move.objects.filter(match)))
+
+
+class ResponseCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.move = make_move('Ember', type='fire', category='special')
+        cls.pokemon = make_pokemon('Charmander', type_1='Fire')
+
+    def test_repeat_list_is_served_from_cache(self):
+        self.client.get('/api/pokemon/?ordering=name&type_1=Fire')
+        # Only the data version is read
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/pokemon/?type_1=Fire&ordering=name')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_save_invalidates_cache(self):
+        self.client.get(f'/api/pokemon/{self.pokemon.id}/')
+        self.pokemon.hp = 99
+        self.pokemon.save()
+        response = self.client.get(f'/api/pokemon/{self.pokemon.id}/')
+        self.assertEqual(response.data['hp'], 99)
+
+    def test_learnset_change_invalidates_cache(self):
+        url = f'/api/pokemon/{self.pokemon.id}/moves/'
+        self.assertEqual(self.client.get(url).data['count'], 0)
+        self.pokemon.moves.add(self.move)
+        self.assertEqual(self.client.get(url).data['count'], 1)
+
+    def test_version_is_bumped_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.pokemon.moves.add(self.move)
+            version = get_data_version()
+        self.assertEqual(len(callbacks), 1)
+        self.assertGreater(get_data_version(), version)
+
+    def test_writes_from_other_processes_invalidate_cache(self):
+        url = '/api/pokemon/?fields=id,hp'
+        self.client.get(url)
+        # Another process writes without signals and bumps the shared version
+        Pokemon.objects.filter(pk=self.pokemon.pk).update(hp=99)
+        DataVersion.objects.update(version=F('version') + 1)
+        self.assertEqual(self.client.get(url).data['results'][0]['hp'], 99)
+
+    def test_recreated_version_is_not_reused(self):
+        version = get_data_version()
+        DataVersion.objects.all().delete()
+        self.assertGreater(get_data_version(), version)
+
+    def test_write_through_api_invalidates_cache(self):
+        self.client.get('/api/moves/')
+        self.client.patch(f'/api/moves/{self.move.id}/', {'power': 60}, format='json')
+        response = self.client.get('/api/moves/')
+        self.assertEqual(response.data['results'][0]['power'], 60)
+
+
+class ConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.move = make_move('Ember', type='fire', category='special')
+        cls.pokemon = make_pokemon('Charmander', type_1='Fire')
+        cls.pokemon.moves.add(cls.move)
+
+    def test_detail_not_modified(self):
+        url = f'/api/pokemon/{self.pokemon.id}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_not_modified_after_one_query(self):
+        etag = self.client.get('/api/pokemon/?type_1=Fire')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/pokemon/?type_1=Fire', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_etag_changes_on_write(self):
+        etag = self.client.get('/api/pokemon/')['ETag']
+        make_pokemon('Vulpix', type_1='Fire')
+        response = self.client.get('/api/pokemon/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_validators_and_cache_follow_unseen_writes(self):
+        detail_url = f'/api/pokemon/{self.pokemon.id}/'
+        detail_etag = self.client.get(detail_url)['ETag']
+        list_etag = self.client.get('/api/pokemon/')['ETag']
+
+        # Another process writes without signals and bumps the shared version
+        Pokemon.objects.filter(pk=self.pokemon.pk).update(hp=99, updated_at=timezone.now())
+        DataVersion.objects.update(version=F('version') + 1)
+
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['hp'], 99)
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/api/pokemon/', HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_query(self):
+        url = f'/api/pokemon/{self.pokemon.id}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url + '?fields=id,name', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_move_change_touches_pokemon(self):
+        before = Pokemon.objects.get(pk=self.pokemon.pk).updated_at
+        self.move.power = 60
+        self.move.save()
+        self.assertGreater(Pokemon.objects.get(pk=self.pokemon.pk).updated_at, before)
+
+    def test_missing_detail_returns_404(self):
+        self.assertEqual(self.client.get('/api/pokemon/999999/').status_code, 404)
+
+
+class KeysetPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(12):
+            make_pokemon(f'Pokemon {i:02d}', speed=i % 4)
+            make_move(f'Move {i:02d}', power=None if i % 3 == 0 else i % 5)
+
+    def walk(self, url):
+        """
+        Follows next links to the end, then previous links back to the start.
+        """
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            last, url = response, response.data['next']
+        url, backwards = last.data['previous'], [pages[-1]]
+        while url:
+            response = self.client.get(url)
+            backwards.insert(0, [row['id'] for row in response.data['results']])
+            url = response.data['previous']
+        self.assertEqual(backwards, pages)
+        return [pk for page in pages for pk in page]
+
+    def test_matches_offset_pagination_for_every_ordering(self):
+        cases = [
+            ('pokemon', Pokemon, ['id', '-id', 'name', 'speed', '-speed']),
+            ('moves', Move, ['power', '-power', 'accuracy']),
+        ]
+        for path, model, orderings in cases:
+            for ordering in orderings:
+                with self.subTest(path=path, ordering=ordering):
+                    ids = self.walk(f'/api/{path}/?pagination=cursor&page_size=5&ordering={ordering}')
+                    name = ordering.lstrip('-')
+                    descending = ordering.startswith('-')
+                    field = F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+                    tie_break = '-id' if descending else 'id'
+                    expected = model.objects.order_by(field, tie_break).values_list('id', flat=True)
+                    self.assertEqual(ids, list(expected))
+
+    def test_cursor_mode_skips_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/pokemon/?pagination=cursor')
+        self.assertNotIn('count', response.data)
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in ctx.captured_queries))
+
+    def test_page_number_without_count(self):
+        response = self.client.get('/api/pokemon/?count=none&page_size=5&page=2')
+        self.assertIsNone(response.data['count'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/pokemon/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor(self):
+        cursors = [{'p': ['abc', 3]}, {'p': [[1], 3]}, {'p': [None, 3]}, {'p': [1]}, {'p': 'ab'}]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+                response = self.client.get(f'/api/pokemon/?ordering=speed&cursor={encoded}')
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data['detail'], 'Invalid cursor')
+
+
+POKEMON_CSV = """#,Name,Type 1,Type 2,Total,HP,Attack,Defense,Sp. Atk,Sp. Def,Speed,Generation,Legendary
+4,Charmander,Fire,,309,39,52,43,60,50,65,1,False
+6,Charizard,Fire,Flying,534,78,84,78,109,85,100,1,False
+6,CharizardMega Charizard X,Fire,Dragon,634,78,130,111,130,85,100,1,False
+7,Squirtle,Water,,314,44,48,65,50,64,not-a-number,1,False
+"""
+
+MOVES_CSV = """name,id,accuracy,pp,power,priority,type,generation,short_descripton,damage_class
+Ember,52,100.0,25,40.0,0,Fire,Generation I,May burn the target.,Special
+Fly,19,95.0,15,90.0,0,Flying,Generation I,Flies up on the first turn.,Physical
+"""
+
+LEARNSETS_CSV = """pokemon,move
+Charmander,Ember
+Charizard,Ember
+Charizard,Fly
+Charizard,Unknown Move
+"""
+
+
+class ImportCommandTests(TestCase):
+    def write_csv(self, content):
+        f = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        f.write(content)
+        f.close()
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+
+    def call_import(self, **kwargs):
+        options = {
+            'pokemon': self.write_csv(POKEMON_CSV),
+            'moves': self.write_csv(MOVES_CSV),
+            'learnsets': self.write_csv(LEARNSETS_CSV),
+        }
+        options.update(kwargs)
+        out = StringIO()
+        self.err = StringIO()
+        call_command('import_pokedex', stdout=out, stderr=self.err, **options)
+        return out.getvalue()
+
+    def test_import_and_reimport(self):
+        output = self.call_import()
+        self.assertIn('1 learnset entries reference unknown', output)
+        self.assertIn('Skipping line 5: ValueError', self.err.getvalue())
+        self.assertEqual(sorted(Pokemon.objects.values_list('name', flat=True)), ['Charizard', 'Charmander'])
+        charizard = Pokemon.objects.get(name='Charizard')
+        self.assertEqual(sorted(charizard.moves.values_list('name', flat=True)), ['Ember', 'Fly'])
+
+        Pokemon.objects.filter(name='Charizard').update(hp=1)
+        self.call_import()
+        self.assertEqual(Pokemon.objects.get(name='Charizard').hp, 78)
+        self.assertEqual(Pokemon.objects.count(), 2)
+        self.assertEqual(Pokemon.moves.through.objects.count(), 3)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'COPY requires Postgres')
+    def test_import_with_copy(self):
+        output = self.call_import()
+        self.assertIn('using COPY', output)
+        self.assertIn('1 learnset entries reference unknown', output)
+        self.assertIn('Skipping line 5: ValueError', self.err.getvalue())
+        charizard = Pokemon.objects.get(name='Charizard')
+        self.assertEqual(charizard.base_stat_total, 534)
+        self.assertEqual(sorted(charizard.moves.values_list('name', flat=True)), ['Ember', 'Fly'])
+
+        Pokemon.objects.filter(name='Charizard').update(hp=1)
+        self.call_import()
+        self.assertEqual(Pokemon.objects.get(name='Charizard').hp, 78)
+        self.assertEqual(Pokemon.objects.count(), 2)
+        self.assertEqual(Pokemon.moves.through.objects.count(), 3)
+
+    def import_duplicates(self, **kwargs):
+        pokemon = POKEMON_CSV + '6,Charizard,Fire,Flying,534,99,84,78,109,85,100,1,False\n'
+        moves = MOVES_CSV + 'Ember,52,100.0,25,99.0,0,Fire,Generation I,Burns.,Special\n'
+        self.call_import(pokemon=self.write_csv(pokemon), moves=self.write_csv(moves), **kwargs)
+        self.assertEqual(Pokemon.objects.get(name='Charizard').hp, 99)
+        self.assertEqual(Move.objects.get(name='Ember').power, 40)
+        self.assertIn("duplicate Pokemon 'Charizard', only the last row is loaded", self.err.getvalue())
+        self.assertIn("duplicate Move 'Ember', only the first row is loaded", self.err.getvalue())
+        self.assertIn('Skipped 3 invalid rows', self.err.getvalue())
+
+    def test_duplicate_names(self):
+        self.import_duplicates(no_copy=True)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'COPY requires Postgres')
+    def test_duplicate_names_with_copy(self):
+        self.import_duplicates()
+        self.assertIn('Skipping line 3: duplicate Pokemon', self.err.getvalue())
+
+    def test_learnsets_header_is_validated(self):
+        with self.assertRaisesMessage(CommandError, 'missing the move column'):
+            self.call_import(learnsets=self.write_csv('pokemon,moves\nCharmander,Ember\n'))
+
+    def test_clear_and_reload(self):
+        self.call_import()
+        call_command('clear_pokedex', interactive=False, stdout=StringIO())
+        self.assertFalse(Pokemon.objects.exists())
+        self.assertFalse(Move.objects.exists())
+        self.assertFalse(Pokemon.moves.through.objects.exists())
+
+        self.call_import()
+        out = StringIO()
+        call_command(
+            'reload_pokedex', stdout=out, stderr=StringIO(),
+            pokemon=self.write_csv(POKEMON_CSV),
+            moves=self.write_csv(MOVES_CSV),
+            learnsets=self.write_csv(LEARNSETS_CSV),
+        )
+        self.assertIn('Reload complete', out.getvalue())
+        self.assertEqual(Pokemon.objects.count(), 2)
+        self.assertEqual(Pokemon.moves.through.objects.count(), 3)
+
+
+class BatchGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.move = make_move('Ember', type='fire', category='special')
+        cls.pokemon = [make_pokemon(name) for name in ('Bulbasaur', 'Charmander', 'Squirtle')]
+        for pokemon in cls.pokemon:
+            pokemon.moves.add(cls.move)
+
+    def test_batch_get_preserves_order_and_reports_missing(self):
+        bulbasaur, charmander, squirtle = self.pokemon
+        with self.assertNumQueries(2):
+            response = self.client.post('/api/pokemon/batch-get/', {
+                'ids': [squirtle.id, 999999, bulbasaur.id],
+                'names': ['Charmander', 'Bulbasaur', 'Missingno'],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['name'] for row in response.data['results']],
+            ['Squirtle', 'Bulbasaur', 'Charmander'],
+        )
+        self.assertEqual(response.data['results'][0]['moves'][0]['name'], 'Ember')
+        self.assertEqual(response.data['missing'], {'ids': [999999], 'names': ['Missingno']})
+
+    def test_batch_get_validation(self):
+        response = self.client.post('/api/moves/batch-get/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/moves/batch-get/', {'ids': list(range(101))}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_get_sparse_fields(self):
+        response = self.client.post(
+            '/api/moves/batch-get/?fields=id,name', {'names': ['Ember']}, format='json'
+        )
+        self.assertEqual(response.data['results'], [{'id': self.move.id, 'name': 'Ember'}])
+
+    def test_list_ids_filter_preserves_order_and_reports_missing(self):
+        bulbasaur, charmander, squirtle = self.pokemon
+        response = self.client.get(f'/api/pokemon/?ids={squirtle.id},999999,{bulbasaur.id}')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Squirtle', 'Bulbasaur'])
+        self.assertEqual(response.data['missing'], {'ids': [999999], 'names': []})
+
+        # Other list filters still apply
+        response = self.client.get(f'/api/pokemon/?ids={squirtle.id},{bulbasaur.id}&search=bulba')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Bulbasaur'])
+        self.assertEqual(response.data['missing']['ids'], [squirtle.id])
+
+    def test_ids_out_of_range_are_rejected(self):
+        too_large = 2 ** 70
+        self.assertEqual(self.client.get(f'/api/pokemon/?ids={too_large}').status_code, 400)
+        self.assertEqual(self.client.get('/api/moves/?ids=1,abc').status_code, 400)
+        response = self.client.post('/api/pokemon/batch-get/', {'ids': [too_large]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkWriteTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ember = make_move('Ember', type='fire', category='special')
+        cls.scratch = make_move('Scratch')
+        cls.charmander = make_pokemon('Charmander', type_1='Fire')
+
+    def pokemon_data(self, name, **kwargs):
+        data = {
+            'name': name, 'type_1': 'Fire', 'hp': 50, 'attack': 50, 'defense': 50,
+            'sp_atk': 50, 'sp_def': 50, 'speed': 50,
+        }
+        data.update(kwargs)
+        return data
+
+    def test_bulk_create(self):
+        payload = [
+            self.pokemon_data('Vulpix', move_ids=[self.ember.id]),
+            self.pokemon_data('Growlithe', moves=[self.ember.id, self.scratch.id]),
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/pokemon/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row['name'] for row in response.data], ['Vulpix', 'Growlithe'])
+        self.assertEqual(len(response.data[1]['moves']), 2)
+        self.assertLess(len(ctx.captured_queries), 10)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        payload = [
+            self.pokemon_data('Vulpix'),
+            self.pokemon_data('Charmander'),
+            self.pokemon_data('Ponyta', move_ids=[999999]),
+            self.pokemon_data('Ponyta'),
+        ]
+        response = self.client.post('/api/pokemon/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('name', response.data[1])
+        self.assertIn('move_ids', response.data[2])
+        self.assertIn('name', response.data[3])
+        self.assertFalse(Pokemon.objects.filter(name='Vulpix').exists())
+
+    def test_bulk_update(self):
+        vulpix = make_pokemon('Vulpix', type_1='Fire')
+        payload = [
+            {'id': self.charmander.id, 'hp': 39, 'move_ids': [self.ember.id]},
+            {'id': vulpix.id, 'name': 'Ninetales'},
+        ]
+        response = self.client.patch('/api/pokemon/bulk/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.charmander.refresh_from_db()
+        self.assertEqual(self.charmander.hp, 39)
+        self.assertEqual(list(self.charmander.moves.all()), [self.ember])
+        self.assertEqual(Pokemon.objects.get(id=vulpix.id).name, 'Ninetales')
+
+    def test_bulk_update_requires_existing_ids(self):
+        response = self.client.patch('/api/pokemon/bulk/', [{'hp': 1}, {'id': 999999}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('id', response.data[0])
+        self.assertIn('id', response.data[1])
+
+
+class LearnsetEditTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ember = make_move('Ember', type='fire', category='special')
+        cls.scratch = make_move('Scratch')
+        cls.charmander = make_pokemon('Charmander', type_1='Fire')
+        cls.moltres = make_pokemon('Moltres', type_1='Fire', type_2='Flying')
+        cls.pidgey = make_pokemon('Pidgey', type_1='Normal', type_2='Flying')
+        cls.pidgey.moves.add(cls.scratch)
+
+    def post(self, payload):
+        return self.client.post('/api/pokemon/learnsets/', payload, format='json')
+
+    def test_add_and_remove_pairs(self):
+        response = self.post({
+            'add': [{'pokemon': self.pidgey.id, 'move': self.ember.id}],
+            'remove': [{'pokemon': self.pidgey.id, 'move': self.scratch.id}],
+        })
+        self.assertEqual(response.data, {'added': 1, 'removed': 1, 'pokemon_updated': 1})
+        self.assertEqual(list(self.pidgey.moves.all()), [self.ember])
+
+    def test_add_by_type_matches_either_type(self):
+        # Move lookup, savepoint, Pokemon lookup, existing pairs, insert,
+        # updated_at touch and savepoint release
+        with self.assertNumQueries(7):
+            response = self.post({'add_by_type': [{'type': 'Fire', 'moves': [self.ember.id]}]})
+        self.assertEqual(response.data['added'], 2)
+        self.assertEqual(
+            sorted(self.ember.pokemon.values_list('name', flat=True)), ['Charmander', 'Moltres']
+        )
+        response = self.post({'add_by_type': [{'type': 'Fire', 'moves': [self.ember.id]}]})
+        self.assertEqual(response.data['added'], 0)
+
+    def test_remove_by_type(self):
+        self.moltres.moves.add(self.scratch)
+        response = self.post({'remove_by_type': [{'type': 'Flying', 'moves': [self.scratch.id]}]})
+        self.assertEqual(response.data['removed'], 2)
+        self.assertFalse(self.scratch.pokemon.exists())
+
+    def test_types_are_case_insensitive_and_validated(self):
+        response = self.post({'add_by_type': [{'type': 'fIRE', 'moves': [self.ember.id]}]})
+        self.assertEqual(response.data['added'], 2)
+        response = self.post({'add_by_type': [{'type': 'Fyre', 'moves': [self.ember.id]}]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_ids_are_rejected(self):
+        response = self.post({'add': [{'pokemon': 999999, 'move': self.ember.id}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pokemon', response.data)
+
+    def test_invalidates_cached_learnsets(self):
+        url = f'/api/pokemon/{self.charmander.id}/moves/'
+        self.assertEqual(self.client.get(url).data['count'], 0)
+        self.post({'add': [{'pokemon': self.charmander.id, 'move': self.ember.id}]})
+        self.assertEqual(self.client.get(url).data['count'], 1)
+
+
+class ReverseLearnsetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.surf = make_move('Surf', type='water', category='special')
+        cls.earthquake = make_move('Earthquake', type='ground')
+        cls.squirtle = make_pokemon('Squirtle', type_1='Water')
+        cls.squirtle.moves.add(cls.surf)
+        cls.swampert = make_pokemon('Swampert', type_1='Water', type_2='Ground')
+        cls.swampert.moves.add(cls.surf, cls.earthquake)
+        cls.geodude = make_pokemon('Geodude', type_1='Rock', type_2='Ground')
+        cls.geodude.moves.add(cls.earthquake)
+
+    def names(self, response):
+        return [row['name'] for row in response.data['results']]
+
+    def test_move_pokemon_lists_learners(self):
+        response = self.client.get(f'/api/moves/{self.surf.id}/pokemon/')
+        self.assertEqual(self.names(response), ['Squirtle', 'Swampert'])
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'sprite', 'type_1', 'type_2'})
+
+    def test_move_pokemon_cursor_pagination(self):
+        url = f'/api/moves/{self.earthquake.id}/pokemon/?pagination=cursor&page_size=1&ordering=-power'
+        response = self.client.get(url)
+        self.assertEqual(self.names(response), ['Swampert'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self.names(response), ['Geodude'])
+
+    def test_move_pokemon_missing_move(self):
+        self.assertEqual(self.client.get('/api/moves/999999/pokemon/').status_code, 404)
+        self.assertEqual(self.client.get('/api/moves/abc/pokemon/').status_code, 404)
+
+    def test_move_pokemon_ignores_move_list_filters(self):
+        for query in ('search=Squ', 'type=fire', 'fields=name'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/moves/{self.surf.id}/pokemon/?{query}')
+                self.assertEqual(self.names(response), ['Squirtle', 'Swampert'])
+
+    def test_learns_move_any_and_all(self):
+        ids = f'{self.surf.id},{self.earthquake.id}'
+        response = self.client.get(f'/api/pokemon/?learns_move={ids}')
+        self.assertEqual(self.names(response), ['Squirtle', 'Swampert', 'Geodude'])
+        response = self.client.get(f'/api/pokemon/?learns_move={ids}&learns_move_match=all')
+        self.assertEqual(self.names(response), ['Swampert'])
+
+
+
+class PokemonMovesActionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pokemon = make_pokemon('Mew', type_1='Psychic')
+        cls.other = make_pokemon('Ditto')
+        moves = [
+            make_move(f'Move {i:03d}', type='fire' if i % 2 else 'water', power=i)
+            for i in range(30)
+        ]
+        cls.pokemon.moves.set(moves)
+
+    def test_paginated_filtered_and_ordered(self):
+        url = f'/api/pokemon/{self.pokemon.id}/moves/'
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 30)
+        self.assertEqual(len(response.data['results']), 25)
+
+        response = self.client.get(url + '?type=fire&ordering=-power&page_size=3')
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual([row['power'] for row in response.data['results']], [29, 27, 25])
+
+    def test_learnset_cache_survives_unrelated_writes(self):
+        url = f'/api/pokemon/{self.pokemon.id}/moves/?fields=id'
+        self.client.get(url)
+        self.other.hp = 1
+        self.other.save()
+        # Only the updated_at lookup shared by the validators and cache key
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 30)
+
+    def test_learnset_cache_invalidated_by_move_edit(self):
+        url = f'/api/pokemon/{self.pokemon.id}/moves/?ordering=id&page_size=1'
+        self.client.get(url)
+        move = Move.objects.get(name='Move 000')
+        move.power = 999
+        move.save()
+        self.assertEqual(self.client.get(url).data['results'][0]['power'], 999)
+
+    def test_missing_pokemon(self):
+        self.assertEqual(self.client.get('/api/pokemon/999999/moves/').status_code, 404)
+        self.assertEqual(self.client.get('/api/pokemon/abc/moves/').status_code, 404)
+
+    def test_filtered_learnsets_are_conditional(self):
+        for query in ('type=fire', 'search=Move 001', 'category=physical'):
+            with self.subTest(query=query):
+                url = f'/api/pokemon/{self.pokemon.id}/moves/?{query}'
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+
+class FilterSetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_pokemon('Charizard', type_1='Fire', type_2='Flying', attack=84, speed=100, sp_atk=109)
+        make_pokemon('Dragonite', type_1='Dragon', type_2='Flying', attack=134, speed=80)
+        make_pokemon('Arcanine', type_1='Fire', attack=110, speed=95)
+        make_pokemon('Snorlax', type_1='Normal', hp=160, attack=110, speed=30)
+        make_move('Flamethrower', type='fire', category='special', power=90)
+        make_move('Fire Blast', type='fire', category='special', power=110, accuracy=85)
+        make_move('Swords Dance', category='status', power=None, accuracy=None)
+
+    def names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data['results']]
+
+    def test_stat_ranges(self):
+        self.assertEqual(self.names('/api/pokemon/?speed__gte=95'), ['Charizard', 'Arcanine'])
+        self.assertEqual(
+            self.names('/api/pokemon/?attack__gte=80&attack__lte=120&speed__gte=80'),
+            ['Charizard', 'Arcanine'],
+        )
+        self.assertEqual(self.names('/api/pokemon/?hp__in=160,1'), ['Snorlax'])
+
+    def test_type_in_and_either_type(self):
+        self.assertEqual(self.names('/api/pokemon/?type_1__in=Fire,Dragon'), ['Charizard', 'Dragonite', 'Arcanine'])
+        self.assertEqual(self.names('/api/pokemon/?type=Flying'), ['Charizard', 'Dragonite'])
+        self.assertEqual(self.names('/api/pokemon/?type=Flying,Normal&speed__lte=90'), ['Dragonite', 'Snorlax'])
+        self.assertEqual(self.names('/api/pokemon/?type_2__isnull=true'), ['Arcanine', 'Snorlax'])
+
+    def test_base_stat_total(self):
+        # Charizard: 50 * 3 + 84 + 100 + 109
+        self.assertEqual(self.names('/api/pokemon/?base_stat_total=443'), ['Charizard'])
+        self.assertEqual(
+            self.names('/api/pokemon/?base_stat_total__gte=440&base_stat_total__lte=460'),
+            ['Charizard', 'Snorlax'],
+        )
+
+    def test_move_ranges(self):
+        self.assertEqual(self.names('/api/moves/?power__gte=100'), ['Fire Blast'])
+        self.assertEqual(self.names('/api/moves/?accuracy__lte=90'), ['Fire Blast'])
+        self.assertEqual(self.names('/api/moves/?power__isnull=true'), ['Swords Dance'])
+        self.assertEqual(self.names('/api/moves/?category__in=status,special&power__lte=100'), ['Flamethrower'])
+
+    def test_invalid_value_is_rejected(self):
+        self.assertEqual(self.client.get('/api/pokemon/?speed__gte=fast').status_code, 400)
+
+
+class DerivedStatsTests(APITestCase):
+    def test_save_computes_derived_stats(self):
+        pokemon = make_pokemon('Snorlax', hp=160, defense=65, sp_def=110, height=2.0, weight=460.0)
+        pokemon.refresh_from_db()
+        self.assertEqual(pokemon.base_stat_total, 160 + 65 + 110 + 50 * 3)
+        self.assertEqual(pokemon.physical_bulk, 160 * 65)
+        self.assertEqual(pokemon.special_bulk, 160 * 110)
+        self.assertAlmostEqual(pokemon.bmi, 115.0)
+
+        pokemon.hp = 100
+        pokemon.save(update_fields=['hp'])
+        pokemon.refresh_from_db()
+        self.assertEqual(pokemon.base_stat_total, 100 + 65 + 110 + 50 * 3)
+        self.assertEqual(pokemon.physical_bulk, 100 * 65)
+
+    def test_unknown_height_has_no_bmi(self):
+        self.assertIsNone(make_pokemon('Missingno').bmi)
+
+    def test_bulk_endpoint_keeps_derived_stats_in_sync(self):
+        response = self.client.post('/api/pokemon/bulk/', [
+            {'name': 'Mew', 'type_1': 'Psychic', 'hp': 100, 'attack': 100, 'defense': 100,
+             'sp_atk': 100, 'sp_def': 100, 'speed': 100},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        mew = Pokemon.objects.get(name='Mew')
+        self.assertEqual(mew.base_stat_total, 600)
+
+        response = self.client.patch('/api/pokemon/bulk/', [{'id': mew.id, 'speed': 50}], format='json')
+        self.assertEqual(response.status_code, 200)
+        mew.refresh_from_db()
+        self.assertEqual(mew.base_stat_total, 550)
+        self.assertEqual(mew.physical_bulk, 100 * 100)
+
+    def test_loader_computes_derived_stats(self):
+        row = {'name': 'Chansey', 'type_1': 'Normal', 'hp': 250, 'attack': 5, 'defense': 5,
+               'sp_atk': 35, 'sp_def': 105, 'speed': 50, 'height': 1.1, 'weight': 34.6}
+        loaders.load_pokemon([[row]])
+        loaders.load_pokemon([[dict(row, defense=10)]])
+        chansey = Pokemon.objects.get(name='Chansey')
+        self.assertEqual(chansey.base_stat_total, 455)
+        self.assertEqual(chansey.physical_bulk, 2500)
+        self.assertAlmostEqual(chansey.bmi, 34.6 / 1.1 ** 2)
+
+    def test_order_and_filter_by_derived_stats(self):
+        make_pokemon('Shuckle', hp=20, defense=230, sp_def=230)
+        make_pokemon('Blissey', hp=255, defense=10, sp_def=135)
+        make_pokemon('Pikachu')
+        response = self.client.get('/api/pokemon/?ordering=-special_bulk&physical_bulk__lte=3000')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Blissey', 'Pikachu'])
+        response = self.client.get('/api/pokemon/?ordering=-base_stat_total&pagination=cursor&page_size=1')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Shuckle'])
+
+
+class NameSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.charizard = make_pokemon('Charizard', type_1='Fire')
+        make_pokemon('Charmander', type_1='Fire')
+        make_pokemon('Pikachu', type_1='Electric')
+        make_move('Fire Blast', type='fire', category='special')
+        make_move('Blast Burn', type='fire', category='special')
+
+    def search(self, params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(row['type'], row['name']) for row in response.data['results']]
+
+    def test_prefix_matches_rank_above_word_matches(self):
+        self.assertEqual(self.search({'q': 'char'}), [('pokemon', 'Charizard'), ('pokemon', 'Charmander')])
+        self.assertEqual(self.search({'q': 'blast'}), [('move', 'Blast Burn'), ('move', 'Fire Blast')])
+
+    def test_exact_match_ranks_first(self):
+        self.assertEqual(self.search({'q': 'charizard'})[0], ('pokemon', 'Charizard'))
+
+    def test_typo_tolerance(self):
+        self.assertEqual(self.search({'q': 'charzard'})[0], ('pokemon', 'Charizard'))
+        self.assertEqual(self.search({'q': 'pikachoo'}), [('pokemon', 'Pikachu')])
+        self.assertEqual(self.search({'q': 'zzz'}), [])
+
+    def test_type_and_limit(self):
+        self.assertEqual(self.search({'q': 'fire', 'type': 'pokemon'}), [])
+        self.assertEqual(self.search({'q': 'char', 'limit': 1}), [('pokemon', 'Charizard')])
+        self.assertEqual(self.client.get('/api/search/?q=char&limit=x').status_code, 400)
+
+    def test_index_is_refreshed_after_writes(self):
+        self.assertEqual(self.search({'q': 'mew'}), [])
+        make_pokemon('Mew', type_1='Psychic')
+        self.assertEqual(self.search({'q': 'mew'}), [('pokemon', 'Mew')])
+        self.charizard.name = 'Charizard X'
+        self.charizard.save()
+        self.assertIn(('pokemon', 'Charizard X'), self.search({'q': 'charizard'}))
+
+
+class AutocompleteTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_pokemon('Charmander', type_1='Fire', sprite='https://example.com/charmander.png')
+        make_pokemon('Charizard', type_1='Fire')
+        make_pokemon('Mr. Mime', type_1='Psychic', type_2='Fairy')
+        make_move('Charm', type='fairy', category='status')
+        make_move('Fire Blast', type='fire', category='special')
+
+    def complete(self, query, **params):
+        response = self.client.get('/api/autocomplete/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_completes_pokemon_names(self):
+        response = self.complete('cha')
+        self.assertEqual(response.json(), [
+            {'id': Pokemon.objects.get(name='Charizard').id, 'name': 'Charizard'},
+            {'id': Pokemon.objects.get(name='Charmander').id, 'name': 'Charmander',
+             'sprite': 'https://example.com/charmander.png'},
+        ])
+        self.assertEqual([item['name'] for item in self.complete('mime').json()], ['Mr. Mime'])
+        self.assertEqual(self.complete('').json(), [])
+
+    def test_completes_moves_and_limits(self):
+        self.assertEqual([item['name'] for item in self.complete('cha', type='move').json()], ['Charm'])
+        self.assertEqual([item['name'] for item in self.complete('bla', type='move').json()], ['Fire Blast'])
+        self.assertEqual(len(self.complete('c', limit=1).json()), 1)
+        self.assertEqual(self.client.get('/api/autocomplete/?q=a&type=item').status_code, 400)
+
+    def test_responses_are_cacheable(self):
+        self.assertIn('max-age=', self.complete('cha')['Cache-Control'])
+        self.assertIn('public', self.complete('cha')['Cache-Control'])
+
+
+class MoveTextSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.thunder_wave = make_move('Thunder Wave', description='Paralyzes the target.',
+                                     effect='Paralyzes the target.', category='status')
+        cls.body_slam = make_move('Body Slam', description='Body Slam - A full-body attack.',
+                                  effect='May paralyze the target.')
+        cls.nuzzle = make_move('Nuzzle', description='Nuzzle - Deals damage.',
+                               effect='Paralyzes the target.')
+        make_move('Tackle', description='Tackle - A physical attack.', effect='Inflicts damage.')
+
+    def search(self, query, **params):
+        response = self.client.get('/api/moves/text-search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_list_search_skips_descriptions(self):
+        response = self.client.get('/api/moves/', {'search': 'full-body'})
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get('/api/moves/', {'search': 'slam'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Body Slam'])
+
+    def test_results_are_ranked(self):
+        results = self.search('paralyzes target')
+        # Matches in the description outrank matches in the effect only, and
+        # plurals match their singular
+        self.assertEqual([row['name'] for row in results], ['Thunder Wave', 'Nuzzle', 'Body Slam'])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+        self.assertEqual(self.search('attack')[0].keys() - {'rank'}, {
+            'id', 'name', 'description', 'type', 'power', 'effect', 'category', 'accuracy',
+        })
+
+    def test_every_word_must_match(self):
+        self.assertEqual([row['name'] for row in self.search('body attack')], ['Body Slam'])
+        self.assertEqual(self.search('body tackle'), [])
+        self.assertEqual(self.search('the'), [])
+
+    def test_fields_and_limit(self):
+        results = self.search('attacks', fields='id,name', limit=1)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(set(results[0]), {'id', 'name', 'rank'})
+
+    def test_index_is_refreshed_after_writes(self):
+        tackle = Move.objects.get(name='Tackle')
+        tackle.effect = 'May paralyze the target.'
+        tackle.save()
+        self.assertIn('Tackle', [row['name'] for row in self.search('paralyze')])
+
+
+class TypeChartTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.charizard = make_pokemon('Charizard', type_1='Fire', type_2='Flying')
+        cls.gengar = make_pokemon('Gengar', type_1='Ghost', type_2='Poison')
+        cls.pikachu = make_pokemon('Pikachu', type_1='Electric')
+
+    def test_dual_type_multipliers(self):
+        multipliers = dict(zip(typechart.TYPES, typechart.defensive_multipliers('Fire', 'Flying')))
+        self.assertEqual(multipliers['rock'], 4)
+        self.assertEqual(multipliers['water'], 2)
+        self.assertEqual(multipliers['grass'], 0.25)
+        self.assertEqual(multipliers['ground'], 0)
+        self.assertEqual(multipliers['normal'], 1)
+
+    def test_table_matches_single_lookups(self):
+        for type_1 in typechart.TYPES:
+            for type_2 in [None] + typechart.TYPES:
+                expected = [
+                    typechart.CHART[attacking, typechart.TYPE_INDEX[type_1]]
+                    * (typechart.CHART[attacking, typechart.TYPE_INDEX[type_2]]
+                       if type_2 not in (None, type_1) else 1)
+                    for attacking in range(len(typechart.TYPES))
+                ]
+                self.assertEqual(typechart.defensive_multipliers(type_1, type_2).tolist(), expected)
+
+    def test_matchups_endpoint(self):
+        response = self.client.get(f'/api/pokemon/{self.gengar.id}/matchups/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['weaknesses'], {'ground': 2.0, 'psychic': 2.0, 'ghost': 2.0, 'dark': 2.0})
+        self.assertEqual(response.data['immunities'], {'normal': 0.0, 'fighting': 0.0})
+        self.assertEqual(response.data['resistances']['bug'], 0.25)
+        self.assertEqual(len(response.data['multipliers']), 18)
+        self.assertEqual(self.client.get('/api/pokemon/999999/matchups/').status_code, 404)
+
+    def test_weaknesses_endpoint(self):
+        response = self.client.get('/api/pokemon/weaknesses/')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Charizard', 'Gengar', 'Pikachu'])
+        self.assertEqual(response.data['results'][2]['weaknesses'], {'ground': 2.0})
+
+        response = self.client.get(f'/api/pokemon/weaknesses/?ids={self.charizard.id}')
+        self.assertEqual(response.data['results'], [{
+            'id': self.charizard.id, 'name': 'Charizard',
+            'weaknesses': {'water': 2.0, 'electric': 2.0, 'rock': 4.0},
+        }])
+
+    def test_weaknesses_reject_invalid_ids(self):
+        response = self.client.get('/api/pokemon/weaknesses/?ids=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['ids'], ["Invalid ids: ['abc']"])
+        response = self.client.get('/api/pokemon/weaknesses/?ids=,')
+        self.assertEqual(response.data['results'], [])
+
+    def test_weaknesses_are_recomputed_after_writes(self):
+        self.client.get('/api/pokemon/weaknesses/')
+        self.pikachu.type_1 = 'Ground'
+        self.pikachu.save()
+        response = self.client.get(f'/api/pokemon/weaknesses/?ids={self.pikachu.id}')
+        self.assertEqual(response.data['results'][0]['weaknesses'], {'water': 2.0, 'grass': 2.0, 'ice': 2.0})
+
+
+class DamageCalculatorTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.charizard = make_pokemon('Charizard', type_1='Fire', type_2='Flying', attack=84, sp_atk=109)
+        cls.venusaur = make_pokemon('Venusaur', type_1='Grass', type_2='Poison', defense=83, sp_def=100)
+        cls.flamethrower = make_move('Flamethrower', type='fire', category='special', power=90)
+        cls.tackle = make_move('Tackle', power=40, accuracy=100)
+        cls.growl = make_move('Growl', category='status', power=None)
+
+    def post(self, body, **params):
+        url = '/api/damage/' + ('?stream=true' if params.get('stream') else '')
+        return self.client.post(url, body, format='json')
+
+    def test_damage_grid(self):
+        response = self.post({
+            'attackers': [self.charizard.id, self.venusaur.id],
+            'defenders': [self.venusaur.id],
+            'moves': [self.flamethrower.id, self.tackle.id, self.growl.id],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['moves'], [self.flamethrower.id, self.tackle.id, self.growl.id])
+        # Flamethrower: (22 * 90 * 109 / 100 / 50 + 2) * 1.5 STAB * 2 effectiveness
+        # Tackle: 22 * 40 * 84 / 83 / 50 + 2, no STAB, neutral
+        self.assertEqual(response.data['damage'][0], [[135, 19, 0]])
+        # Venusaur's attack and special attack are 50
+        self.assertEqual(response.data['damage'][1], [[int((22 * 90 * 50 / 100 / 50 + 2) * 2), 12, 0]])
+
+    def test_unknown_move_types_get_no_stab(self):
+        # Pidgey has no secondary type, which shares its marker with unknown types
+        pidgey = make_pokemon('Pidgey', type_1='Normal', attack=50)
+        shadow_rush = make_move('Shadow Rush', type='shadow', power=40)
+        response = self.post({
+            'attackers': [pidgey.id], 'defenders': [self.venusaur.id], 'moves': [shadow_rush.id],
+        })
+        self.assertEqual(response.data['damage'][0][0], [int(22 * 40 * 50 / 83 / 50 + 2)])
+
+    def test_expected_damage_weights_accuracy(self):
+        self.tackle.accuracy = 50
+        self.tackle.save()
+        response = self.post({
+            'attackers': [self.charizard.id], 'defenders': [self.venusaur.id],
+            'moves': [self.tackle.id], 'expected': True,
+        })
+        self.assertAlmostEqual(
+            response.data['damage'][0][0][0], round((22 * 40 * 84 / 83 / 50 + 2) * 0.925 * 0.5, 2)
+        )
+
+    def test_streaming(self):
+        response = self.post({
+            'attackers': [self.charizard.id, self.venusaur.id],
+            'defenders': [self.venusaur.id, self.charizard.id],
+            'moves': [self.flamethrower.id],
+        }, stream=True)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(lines[0]['attackers'], [self.charizard.id, self.venusaur.id])
+        self.assertEqual([line['attacker'] for line in lines[1:]], [self.charizard.id, self.venusaur.id])
+        self.assertEqual(lines[1]['damage'][0], [135])
+
+    def test_chunks_cover_the_grid(self):
+        attackers, defenders, moves, _ = damage.load_grid(
+            [self.charizard.id, self.venusaur.id] * 3, [self.venusaur.id], [self.flamethrower.id],
+        )
+        full = damage.damage_grid(attackers, defenders, moves)
+        chunks = list(damage.iter_damage_chunks(attackers, defenders, moves, max_cells=4))
+        self.assertEqual([start for start, _ in chunks], [0, 4])
+        self.assertEqual(np.concatenate([grid for _, grid in chunks]).tolist(), full.tolist())
+
+    def test_missing_ids_and_limits(self):
+        response = self.post({'attackers': [999999], 'defenders': [self.venusaur.id], 'moves': [self.tackle.id]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'attackers': ['Unknown ids: [999999]']})
+        response = self.post({'attackers': [], 'defenders': [self.venusaur.id], 'moves': [self.tackle.id]})
+        self.assertEqual(response.status_code, 400)
+
+
+class SimilarityTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.machop = make_pokemon('Machop', type_1='Fighting', hp=70, attack=80, defense=50, sp_atk=35, sp_def=35, speed=35)
+        cls.machoke = make_pokemon('Machoke', type_1='Fighting', hp=80, attack=100, defense=70, sp_atk=50, sp_def=60, speed=45)
+        cls.geodude = make_pokemon('Geodude', type_1='Rock', type_2='Ground', hp=40, attack=80, defense=100, sp_atk=30, sp_def=30, speed=20)
+        cls.abra = make_pokemon('Abra', type_1='Psychic', hp=25, attack=20, defense=15, sp_atk=105, sp_def=55, speed=90)
+
+    def similar_names(self, response):
+        return [row['name'] for row in response.data['similar']]
+
+    def test_cosine_and_euclidean_neighbors(self):
+        response = self.client.get(f'/api/pokemon/{self.machop.id}/similar/?k=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.similar_names(response), ['Machoke', 'Geodude'])
+        self.assertLessEqual(response.data['similar'][0]['score'], 1)
+
+        response = self.client.get(f'/api/pokemon/{self.abra.id}/similar/?metric=euclidean')
+        self.assertEqual(len(response.data['similar']), 3)
+        distances = [row['score'] for row in response.data['similar']]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_matches_brute_force(self):
+        index = similarity.get_similarity_index()
+        for metric in similarity.METRICS:
+            neighbors, _ = index.neighbors(range(len(index.ids)), k=3, metric=metric)
+            for position, row in enumerate(neighbors.tolist()):
+                expected = index.scores(np.array([position]), metric)[0]
+                expected[position] = np.inf
+                self.assertEqual(row, np.argsort(expected, kind='stable')[:3].tolist())
+
+    def test_batched_queries(self):
+        response = self.client.post('/api/pokemon/similar/', {
+            'ids': [self.machoke.id, 999999], 'k': 1, 'metric': 'euclidean',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['similar'][0]['name'], 'Machop')
+        self.assertEqual(response.data['missing'], [999999])
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/pokemon/999999/similar/').status_code, 404)
+        self.assertEqual(self.client.get('/api/pokemon/abc/similar/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/pokemon/{self.abra.id}/similar/?metric=manhattan').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/pokemon/{self.abra.id}/similar/?k=0').status_code, 400)
+
+    def test_index_is_rebuilt_after_writes(self):
+        self.client.get(f'/api/pokemon/{self.machop.id}/similar/')
+        make_pokemon('Machamp', type_1='Fighting', hp=90, attack=130, defense=80, sp_atk=65, sp_def=85, speed=55)
+        response = self.client.get(f'/api/pokemon/{self.machoke.id}/similar/?k=1')
+        self.assertEqual(self.similar_names(response), ['Machamp'])
+
+
+class TeamOptimizerTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        surf = make_move('Surf', type='water', category='special', power=90)
+        ice_beam = make_move('Ice Beam', type='ice', category='special', power=90)
+        ember = make_move('Ember', type='fire', category='special', power=40)
+        thunderbolt = make_move('Thunderbolt', type='electric', category='special', power=90)
+        growl = make_move('Growl', category='status', power=None)
+
+        cls.squirtle = make_pokemon('Squirtle', type_1='Water')
+        cls.squirtle.moves.set([surf, ice_beam])
+        cls.charmander = make_pokemon('Charmander', type_1='Fire')
+        cls.charmander.moves.set([ember])
+        cls.pikachu = make_pokemon('Pikachu', type_1='Electric', speed=90)
+        cls.pikachu.moves.set([thunderbolt])
+        cls.bulbasaur = make_pokemon('Bulbasaur', type_1='Grass', type_2='Poison')
+        cls.bulbasaur.moves.set([growl])
+        cls.geodude = make_pokemon('Geodude', type_1='Rock', type_2='Ground')
+
+    def post(self, body):
+        return self.client.post('/api/teams/optimize/', body, format='json')
+
+    def names(self, team):
+        return {member['name'] for member in team['pokemon']}
+
+    def test_coverage_masks(self):
+        index = teams.get_team_index()
+        charmander = index.describe([index.positions[self.charmander.id]])
+        self.assertEqual(charmander['super_effective'], ['grass', 'ice', 'bug', 'steel'])
+        self.assertEqual(charmander['resisted'], ['fire', 'grass', 'ice', 'bug', 'steel', 'fairy'])
+
+        # Status moves bring no coverage
+        bulbasaur = index.describe([index.positions[self.bulbasaur.id]])
+        self.assertEqual(bulbasaur['super_effective'], [])
+        self.assertEqual(bulbasaur['coverage'], len(bulbasaur['resisted']))
+
+    def test_best_team_matches_brute_force(self):
+        response = self.post({'size': 3, 'results': 1})
+        self.assertEqual(response.status_code, 200)
+        best = response.data['teams'][0]
+
+        index = teams.get_team_index()
+        expected = max(
+            (index.describe(list(team)) for team in itertools.combinations(range(len(index.ids)), 3)),
+            key=lambda team: (team['coverage'], team['base_stat_total']),
+        )
+        self.assertEqual(best['coverage'], expected['coverage'])
+        self.assertEqual(best['base_stat_total'], expected['base_stat_total'])
+        self.assertEqual(response.data['max_coverage'], 36)
+        self.assertFalse(response.data['timed_out'])
+
+    def test_pruned_beam_search_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            masks = rng.integers(0, 1 << 36, (3, 12), dtype=np.uint64)
+            masks = masks[0] & masks[1] & masks[2]
+            totals = rng.integers(100, 700, 12)
+            kept = teamsearch.prune_pool(masks, totals, 4)
+            _, scores, _ = teamsearch.beam_search(masks[kept], totals[kept], 4, results=1)
+            expected = max(
+                teamsearch.popcount(np.bitwise_or.reduce(masks[list(team)])) * teamsearch.TOTAL_SCALE
+                + totals[list(team)].sum()
+                for team in itertools.combinations(range(12), 4)
+            )
+            self.assertEqual(scores[0], expected)
+
+    def test_constraints(self):
+        response = self.post({
+            'size': 2,
+            'include': [self.geodude.id],
+            'exclude': [self.squirtle.id],
+            'results': 10,
+        })
+        self.assertEqual(response.status_code, 200)
+        for team in response.data['teams']:
+            self.assertEqual(team['pokemon'][0]['id'], self.geodude.id)
+            self.assertEqual(len(team['pokemon']), 2)
+            self.assertNotIn('Squirtle', self.names(team))
+
+        response = self.post({'pool': [self.pikachu.id, self.charmander.id], 'min_base_stat_total': 310})
+        self.assertEqual([self.names(team) for team in response.data['teams']], [{'Pikachu'}])
+
+    def test_time_budget(self):
+        index = teams.get_team_index()
+        found, _, timed_out = teamsearch.beam_search(index.masks, index.totals, 3, deadline=0)
+        self.assertTrue(timed_out)
+        self.assertEqual(found.shape[1], 3)
+
+    def test_parallel_search(self):
+        with override_settings(POKEDEX_TEAM_PARALLEL_POOL=1, POKEDEX_TEAM_WORKERS=2):
+            self.assertEqual(teams.team_workers(5), 2)
+            parallel = self.post({'size': 3}).data
+        serial = self.post({'size': 3}).data
+        self.assertEqual(parallel['teams'][0]['coverage'], serial['teams'][0]['coverage'])
+        self.assertEqual(len(parallel['teams']), len(serial['teams']))
+
+    def test_errors(self):
+        response = self.post({'include': [999999]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['include'], ['Unknown ids: [999999]'])
+        self.assertEqual(self.post({'size': 1, 'include': [self.geodude.id, self.pikachu.id]}).status_code, 400)
+        self.assertEqual(self.post({'include': [self.geodude.id], 'exclude': [self.geodude.id]}).status_code, 400)
+
+
+class LearnsetFilterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.surf = make_move('Surf', type='water', category='special')
+        cls.earthquake = make_move('Earthquake', type='ground')
+        cls.ice_beam = make_move('Ice Beam', type='ice', category='special')
+        cls.squirtle = make_pokemon('Squirtle', type_1='Water')
+        cls.squirtle.moves.add(cls.surf, cls.ice_beam)
+        cls.swampert = make_pokemon('Swampert', type_1='Water', type_2='Ground')
+        cls.swampert.moves.add(cls.surf, cls.earthquake, cls.ice_beam)
+        cls.geodude = make_pokemon('Geodude', type_1='Rock', type_2='Ground')
+        cls.geodude.moves.add(cls.earthquake)
+        cls.pikachu = make_pokemon('Pikachu', type_1='Electric')
+
+    def names(self, query):
+        response = self.client.get(f'/api/pokemon/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data['results']]
+
+    def test_all_any_and_none(self):
+        moves = f'{self.surf.id},{self.earthquake.id},{self.ice_beam.id}'
+        self.assertEqual(self.names(f'learns_move={moves}&learns_move_match=all'), ['Swampert'])
+        self.assertEqual(self.names(f'learns_move={moves}'), ['Squirtle', 'Swampert', 'Geodude'])
+        self.assertEqual(self.names(f'learns_move_exclude={self.surf.id}'), ['Geodude', 'Pikachu'])
+        self.assertEqual(
+            self.names(f'learns_move={self.surf.id}&learns_move_exclude={self.earthquake.id}'),
+            ['Squirtle'],
+        )
+
+    def test_unknown_moves(self):
+        self.assertEqual(self.names(f'learns_move={self.surf.id},999999&learns_move_match=all'), [])
+        self.assertEqual(self.names(f'learns_move={self.surf.id},999999'), ['Squirtle', 'Swampert'])
+        self.assertEqual(self.names('learns_move=abc'), [])
+        self.assertEqual(len(self.names('learns_move_exclude=999999')), 4)
+        too_large = 2 ** 70
+        self.assertEqual(self.names(f'learns_move={self.surf.id},{too_large}&learns_move_match=all'), [])
+        self.assertEqual(self.names(f'learns_move={self.surf.id},{too_large}'), ['Squirtle', 'Swampert'])
+        self.assertEqual(len(self.names(f'learns_move_exclude={too_large}')), 4)
+
+    def test_results_follow_learnset_changes(self):
+        query = f'learns_move={self.earthquake.id}&learns_move_match=all'
+        self.assertEqual(self.names(query), ['Swampert', 'Geodude'])
+        self.pikachu.moves.add(self.earthquake)
+        self.assertEqual(self.names(query), ['Swampert', 'Geodude', 'Pikachu'])
+        self.swampert.moves.remove(self.earthquake)
+        self.assertEqual(self.names(query), ['Geodude', 'Pikachu'])
+
+    @override_settings(POKEDEX_LEARNSET_BITMAPS=False)
+    def test_semi_join_uses_the_through_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.names(f'learns_move={self.earthquake.id}'), ['Swampert', 'Geodude'])
+        self.assertTrue(any('pokemon_moves' in captured['sql'] for captured in queries.captured_queries))
+
+
+@override_settings(POKEDEX_LEARNSET_BITMAPS=True)
+class LearnsetBitmapTests(LearnsetFilterTests):
+    def test_matches_through_table(self):
+        bitmaps = learnsets.get_learnset_bitmaps()
+        through = Pokemon.moves.through.objects
+        for move in Move.objects.all():
+            expected = set(through.filter(move=move).values_list('pokemon_id', flat=True))
+            matched = bitmaps.match(all_of=[move.id])
+            self.assertEqual(set(bitmaps.ids[matched].tolist()), expected)
+
+    def test_many_moves_span_words(self):
+        rows = [(pokemon_id, move_id) for pokemon_id in range(3) for move_id in range(pokemon_id, 200, 3)]
+        bitmaps = learnsets.LearnsetBitmaps(rows, range(3), range(200))
+        self.assertEqual(bitmaps.bits.shape, (3, 4))
+        self.assertEqual(bitmaps.ids[bitmaps.match(all_of=[1, 130, 199])].tolist(), [1])
+        self.assertEqual(bitmaps.ids[bitmaps.match(any_of=[0, 199], none_of=[130])].tolist(), [0])
+
+    def test_queries_skip_the_through_table(self):
+        query = f'learns_move={self.surf.id},{self.earthquake.id}&learns_move_match=all'
+        self.names(query)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.names(query + '&page_size=5'), ['Swampert'])
+        self.assertFalse(any('pokemon_moves' in captured['sql'] for captured in queries.captured_queries))
+
+    def test_long_id_lists_use_the_through_table(self):
+        query = f'learns_move={self.surf.id}'
+        with mock.patch.object(learnsets, 'MAX_LISTED_IDS', 1):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.names(query), ['Squirtle', 'Swampert'])
+        self.assertTrue(any('pokemon_moves' in captured['sql'] for captured in queries.captured_queries))
@@ -0,0 +1,148 @@
+"""
+Type effectiveness chart and defensive matchups.
+
+CHART[attacking, defending] holds the damage multiplier of an attack of one
+type against a single defending type, for the 18 types in Move.MOVE_TYPES.
+DEFENSIVE[attacking, type_1, type_2] extends it to every pair of defending
+types in one broadcast multiplication, with the extra index NO_TYPE standing
+for a missing (or unknown) secondary type.
+
+Pokemon store capitalized type names ("Fire") and moves lowercase ones
+("fire"), so type names are matched case-insensitively.
+"""
+
+import numpy as np
+
+from .cache import VersionedIndex
+from .models import Move, Pokemon
+
+TYPES = [value for value, _ in Move.MOVE_TYPES]
+TYPE_INDEX = {name: i for i, name in enumerate(TYPES)}
+NO_TYPE = len(TYPES)
+
+# Attacking type -> (super effective against, not very effective against, no effect on)
+EFFECTIVENESS = {
+    'normal': ([], ['rock', 'steel'], ['ghost']),
+    'fire': (['grass', 'ice', 'bug', 'steel'], ['fire', 'water', 'rock', 'dragon'], []),
+    'water': (['fire', 'ground', 'rock'], ['water', 'grass', 'dragon'], []),
+    'electric': (['water', 'flying'], ['electric', 'grass', 'dragon'], ['ground']),
+    'grass': (['water', 'ground', 'rock'],
+              ['fire', 'grass', 'poison', 'flying', 'bug', 'dragon', 'steel'], []),
+    'ice': (['grass', 'ground', 'flying', 'dragon'], ['fire', 'water', 'ice', 'steel'], []),
+    'fighting': (['normal', 'ice', 'rock', 'dark', 'steel'],
+                 ['poison', 'flying', 'psychic', 'bug', 'fairy'], ['ghost']),
+    'poison': (['grass', 'fairy'], ['poison', 'ground', 'rock', 'ghost'], ['steel']),
+    'ground': (['fire', 'electric', 'poison', 'rock', 'steel'], ['grass', 'bug'], ['flying']),
+    'flying': (['grass', 'fighting', 'bug'], ['electric', 'rock', 'steel'], []),
+    'psychic': (['fighting', 'poison'], ['psychic', 'steel'], ['dark']),
+    'bug': (['grass', 'psychic', 'dark'],
+            ['fire', 'fighting', 'poison', 'flying', 'ghost', 'steel', 'fairy'], []),
+    'rock': (['fire', 'ice', 'flying', 'bug'], ['fighting', 'ground', 'steel'], []),
+    'ghost': (['psychic', 'ghost'], ['dark'], ['normal']),
+    'dragon': (['dragon'], ['steel'], ['fairy']),
+    'dark': (['psychic', 'ghost'], ['fighting', 'dark', 'fairy'], []),
+    'steel': (['ice', 'rock', 'fairy'], ['fire', 'water', 'electric', 'steel'], []),
+    'fairy': (['fighting', 'dragon', 'dark'], ['fire', 'poison', 'steel'], []),
+}
+
+def build_chart():
+    chart = np.ones((len(TYPES), len(TYPES)))
+    for attacking, groups in EFFECTIVENESS.items():
+        for multiplier, defending in zip((2.0, 0.5, 0.0), groups):
+            chart[TYPE_INDEX[attacking], [TYPE_INDEX[name] for name in defending]] = multiplier
+    return chart
+
+CHART = build_chart()
+CHART.flags.writeable = False
+
+# Add a neutral column for NO_TYPE, then multiply every pair of columns
+_extended = np.hstack([CHART, np.ones((len(TYPES), 1))])
+DEFENSIVE = _extended[:, :, None] * _extended[:, None, :]
+DEFENSIVE.flags.writeable = False
+
+def type_index(name):
+    """Returns the chart index of a type name, or NO_TYPE for unknown or missing types"""
+    return TYPE_INDEX.get((name or '').lower(), NO_TYPE)
+
+def defensive_multipliers(type_1, type_2=None):
+    """
+    Returns the damage multiplier of each attacking type against a Pokemon
+    with the given types, as an array in TYPES order.
+    """
+    first, second = type_index(type_1), type_index(type_2)
+    if second == first:
+        second = NO_TYPE
+    return DEFENSIVE[:, first, second]
+
+def group_multipliers(multipliers):
+    """
+    Splits an array of multipliers in TYPES order into weaknesses,
+    resistances and immunities, each mapping type names to multipliers.
+    """
+    groups = {'weaknesses': {}, 'resistances': {}, 'immunities': {}}
+    for name, multiplier in zip(TYPES, multipliers.tolist()):
+        if multiplier > 1:
+            groups['weaknesses'][name] = multiplier
+        elif multiplier == 0:
+            groups['immunities'][name] = multiplier
+        elif multiplier < 1:
+            groups['resistances'][name] = multiplier
+    return groups
+
+def matchups(type_1, type_2=None):
+    """
+    Returns the defensive matchups of a type combination: every multiplier,
+    plus the weaknesses, resistances and immunities.
+    """
+    multipliers = defensive_multipliers(type_1, type_2)
+    return {
+        'multipliers': dict(zip(TYPES, multipliers.tolist())),
+        **group_multipliers(multipliers),
+    }
+
+class MatchupTable:
+    """
+    Defensive multipliers of every Pokemon, as an (N, 18) array aligned
+    with the `ids` and `names` arrays and ordered by id.
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        rows = list(rows)
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.names = [row[1] for row in rows]
+        first = np.array([type_index(row[2]) for row in rows], dtype=np.intp)
+        second = np.array([type_index(row[3]) for row in rows], dtype=np.intp)
+        second[second == first] = NO_TYPE
+        # One fancy-indexing pass over DEFENSIVE for all Pokemon
+        self.multipliers = DEFENSIVE[:, first, second].T.copy()
+
+        weak_rows, weak_columns = np.nonzero(self.multipliers > 1)
+        weaknesses = [{} for _ in rows]
+        for i, j in zip(weak_rows.tolist(), weak_columns.tolist()):
+            weaknesses[i][TYPES[j]] = float(self.multipliers[i, j])
+        self.weakness_rows = [
+            {'id': pk, 'name': name, 'weaknesses': weak}
+            for pk, name, weak in zip(self.ids.tolist(), self.names, weaknesses)
+        ]
+        self.positions = {pk: i for i, pk in enumerate(self.ids.tolist())}
+
+    @classmethod
+    def build(cls, version=None):
+        rows = Pokemon.objects.order_by('id').values_list('id', 'name', 'type_1', 'type_2')
+        return cls(rows, version)
+
+    def weaknesses(self, ids=None):
+        """
+        Returns {id, name, weaknesses} dicts for the given ids in id order,
+        or for every Pokemon when ids is None.
+        """
+        if ids is None:
+            return self.weakness_rows
+        positions = sorted(self.positions[pk] for pk in set(ids) if pk in self.positions)
+        return [self.weakness_rows[i] for i in positions]
+
+_matchup_table = VersionedIndex(MatchupTable.build)
+
+def get_matchup_table():
+    return _matchup_table.get()
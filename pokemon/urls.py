@@ -1,11 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PokemonViewSet, MoveViewSet
+from .views import AutocompleteView, DamageView, PokemonViewSet, MoveViewSet, SearchView, TeamView
 
 router = DefaultRouter()
 router.register(r'pokemon', PokemonViewSet)
 router.register(r'moves', MoveViewSet)
 
 urlpatterns = [
+    path('search/', SearchView.as_view(), name='search'),
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
+    path('damage/', DamageView.as_view(), name='damage'),
+    path('teams/optimize/', TeamView.as_view(), name='team-optimize'),
     path('', include(router.urls)),
 ]
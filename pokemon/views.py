@@ -1,39 +1,525 @@
-from rest_framework import viewsets
+import json
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from .models import Pokemon, Move
-from .serializers import PokemonSerializer, MoveSerializer
+from . import damage, similarity, teams, typechart
+from .cache import bump_data_version, cache_object_response, cache_response
+from .conditional import conditional_response
+from .models import MAX_ID, MIN_ID, Pokemon, Move
+from .pagination import PokedexPagination
+from .search import SEARCH_KINDS, autocomplete, get_search_backend
+from .filters import LearnsMoveFilterBackend, MoveFilterSet, PokemonFilterSet
+from .fulltext import search_moves
+from .serializers import (
+    BatchGetSerializer, DamageRequestSerializer, LearnsetEditSerializer, MoveSerializer,
+    PokemonListSerializer, PokemonSerializer, SimilarRequestSerializer, TeamRequestSerializer,
+)
+
+def parse_list_param(request, name):
+    """
+    Parses a comma-separated query parameter into a list of non-empty values.
+    """
+    value = request.query_params.get(name, '')
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def parse_id_list_param(request, name):
+    """
+    Parses a comma-separated query parameter of ids, or returns None when it
+    is not given. Items that are not valid ids are rejected with a 400.
+    """
+    if not request.query_params.get(name):
+        return None
+    ids, invalid = [], []
+    for item in parse_list_param(request, name):
+        try:
+            pk = int(item)
+        except ValueError:
+            pk = None
+        if pk is None or not MIN_ID <= pk <= MAX_ID:
+            invalid.append(item)
+        else:
+            ids.append(pk)
+    if invalid:
+        raise ValidationError({name: [f'Invalid ids: {invalid}']})
+    return ids
+
+class SparseFieldsetMixin:
+    """
+    Adds `?fields=` projections and `?expand=` opt-ins to a viewset.
+
+    The list action renders `list_serializer_class` by default, detail actions
+    render every field of `serializer_class`. Relations in `expandable_fields`
+    are only rendered on lists when requested through `expand`. Whenever a
+    projection applies, the queryset is narrowed with `only()` so unused
+    columns are neither fetched nor serialized.
+    """
+    list_serializer_class = None
+    expandable_fields = []
+    # Actions that only read data even though they are not safe methods
+    read_actions = ['batch_get']
+
+    def get_projection(self):
+        """
+        Returns the field names to render, or None to render every field.
+        Unknown names in `fields` are rejected with a 400.
+        """
+        if self.request is None:
+            return None
+        if self.request.method not in SAFE_METHODS and self.action not in self.read_actions:
+            return None
+
+        requested = parse_list_param(self.request, 'fields')
+        expand = [name for name in parse_list_param(self.request, 'expand')
+                  if name in self.expandable_fields]
+
+        if requested:
+            unknown = [name for name in requested if name not in self.serializer_class.Meta.fields]
+            if unknown:
+                raise ValidationError({'fields': [f'Unknown fields: {", ".join(unknown)}']})
+            fields = [name for name in self.serializer_class.Meta.fields if name in requested]
+        elif self.action == 'list' and self.list_serializer_class is not None:
+            fields = list(self.list_serializer_class.Meta.fields)
+        else:
+            return None
+
+        return fields + [name for name in expand if name not in fields]
+
+    def get_serializer_class(self):
+        if (self.action == 'list' and self.list_serializer_class is not None
+                and not parse_list_param(self.request, 'fields')
+                and not parse_list_param(self.request, 'expand')):
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_projection()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_projection()
+        if fields is None:
+            return queryset
+
+        concrete_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        queryset = queryset.only('id', *[name for name in fields if name in concrete_fields])
+
+        # Drop prefetches for relations that will not be rendered
+        if not any(name in fields for name in self.expandable_fields):
+            queryset = queryset.prefetch_related(None)
+
+        return queryset
+
+class CachedResponseMixin:
+    """
+    Serves list and retrieve responses from the versioned response cache,
+    answering conditional requests with 304 Not Modified.
+    """
+    @conditional_response
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response
+    @cache_object_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class BatchGetMixin:
+    """
+    Adds `POST .../batch-get/` to fetch many objects by id and/or name in one
+    request, with the full detail representation.
+
+    Lists filtered with `?ids=1,4,7` are answered the same way, in the
+    requested order with the missing ids, using the list representation
+    and any other list filters.
+    """
+    def list(self, request, *args, **kwargs):
+        ids = parse_list_param(request, 'ids')
+        if not ids:
+            return super().list(request, *args, **kwargs)
+        batch = BatchGetSerializer(data={'ids': ids})
+        batch.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.get_batch(queryset, batch.validated_data['ids'], []))
 
-class PokemonViewSet(viewsets.ModelViewSet):
-    queryset = Pokemon.objects.all()
+    @action(detail=False, methods=['post'], url_path='batch-get')
+    def batch_get(self, request):
+        """
+        Returns the requested objects in the order they were requested,
+        followed by the ids and names that were not found.
+        """
+        batch = BatchGetSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        ids = batch.validated_data.get('ids', [])
+        names = batch.validated_data.get('names', [])
+        return Response(self.get_batch(self.get_queryset(), ids, names))
+
+    def get_batch(self, queryset, ids, names):
+        objects = list(queryset.filter(Q(id__in=ids) | Q(name__in=names)))
+        by_id = {obj.id: obj for obj in objects}
+        by_name = {obj.name: obj for obj in objects}
+
+        # Preserve the requested order, without repeating objects
+        ordered = [by_id[pk] for pk in ids if pk in by_id]
+        ordered += [by_name[name] for name in names if name in by_name]
+        ordered = list({obj.id: obj for obj in ordered}.values())
+
+        serializer = self.get_serializer(ordered, many=True)
+        return {
+            'results': serializer.data,
+            'missing': {
+                'ids': [pk for pk in ids if pk not in by_id],
+                'names': [name for name in names if name not in by_name],
+            },
+        }
+
+class PokemonViewSet(CachedResponseMixin, SparseFieldsetMixin, BatchGetMixin, viewsets.ModelViewSet):
+    # Prefetch moves so nested serialization costs one extra query per page,
+    # not one per Pokemon
+    queryset = Pokemon.objects.prefetch_related('moves')
     serializer_class = PokemonSerializer
+    list_serializer_class = PokemonListSerializer
+    expandable_fields = ['moves']
+    pagination_class = PokedexPagination
+    bulk_max_items = 100
     
     # Configure filtering, searching, and ordering
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['type_1', 'type_2']
+    filter_backends = [
+        LearnsMoveFilterBackend, DjangoFilterBackend, SearchFilter, OrderingFilter,
+    ]
+    filterset_class = PokemonFilterSet
     search_fields = ['name', 'type_1', 'type_2']
-    ordering_fields = ['id', 'name', 'hp', 'attack', 'defense', 'sp_atk', 'sp_def', 'speed']
+    ordering_fields = [
+        'id', 'name', 'hp', 'attack', 'defense', 'sp_atk', 'sp_def', 'speed',
+        'base_stat_total', 'physical_bulk', 'special_bulk', 'bmi',
+    ]
     ordering = ['id']
     
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Creates (POST) or partially updates (PATCH) a list of Pokemon in one
+        transaction. Updates must include each Pokemon's `id`. Validation
+        errors are reported per item, in request order.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=request.data, many=True, max_length=self.bulk_max_items)
+        else:
+            ids = [item.get('id') for item in request.data if isinstance(item, dict)]
+            instances = Pokemon.objects.filter(id__in=[pk for pk in ids if isinstance(pk, int)])
+            serializer = self.get_serializer(
+                instances, data=request.data, many=True, partial=True, max_length=self.bulk_max_items
+            )
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            with transaction.atomic():
+                pokemon = serializer.save()
+                # Bulk writes skip model signals
+                transaction.on_commit(bump_data_version)
+        except IntegrityError as e:
+            raise ValidationError({'non_field_errors': [str(e)]})
+
+        # Re-read the rows with their moves prefetched for the response
+        ids = [obj.id for obj in pokemon]
+        saved = self.get_queryset().in_bulk(ids)
+        data = self.get_serializer([saved[pk] for pk in ids], many=True).data
+        status_code = status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK
+        return Response(data, status=status_code)
+    
+    @action(detail=False, methods=['post'])
+    def learnsets(self, request):
+        """
+        Adds and removes (Pokemon, move) pairs, or moves for every Pokemon of
+        a type, directly on the learnset through table in one transaction.
+        """
+        serializer = LearnsetEditSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            result = serializer.save()
+            # Through table writes skip m2m_changed
+            transaction.on_commit(bump_data_version)
+        return Response(result)
+    
     @action(detail=True, methods=['get'])
+    @conditional_response
+    @cache_object_response
     def moves(self, request, pk=None):
         """
-        Returns a list of moves that the Pokemon with the given ID can learn.
+        Returns a paginated list of moves that the Pokemon with the given ID
+        can learn, supporting the same filtering, searching, ordering and
+        sparse fieldsets as the move list.
         """
-        pokemon = self.get_object()
-        moves = pokemon.moves.all()
-        serializer = MoveSerializer(moves, many=True)
-        return Response(serializer.data)
+        pokemon = get_object_or_404(Pokemon.objects.only('id'), pk=pk)
+
+        # Delegate to the move list so both endpoints behave the same
+        move_view = MoveViewSet(
+            request=request, format_kwarg=self.format_kwarg, action='list', args=(), kwargs={},
+        )
+        moves = move_view.filter_queryset(pokemon.moves.all())
+        page = move_view.paginate_queryset(moves)
+        serializer = move_view.get_serializer(page, many=True)
+        return move_view.get_paginated_response(serializer.data)
 
-class MoveViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    @conditional_response
+    def matchups(self, request, pk=None):
+        """
+        Returns the damage multiplier of every attacking type against the
+        Pokemon with the given ID, grouped into weaknesses, resistances and
+        immunities.
+        """
+        pokemon = get_object_or_404(Pokemon.objects.only('id', 'name', 'type_1', 'type_2'), pk=pk)
+        return Response({
+            'id': pokemon.id,
+            'name': pokemon.name,
+            'type_1': pokemon.type_1,
+            'type_2': pokemon.type_2,
+            **typechart.matchups(pokemon.type_1, pokemon.type_2),
+        })
+
+    @action(detail=True, methods=['get'])
+    @cache_response
+    def similar(self, request, pk=None):
+        """
+        Returns the `k` Pokemon with the stat spread and types closest to the
+        Pokemon with the given ID, by `cosine` similarity (the default) or
+        `euclidean` distance.
+        """
+        pokemon = get_object_or_404(Pokemon.objects.only('id'), pk=pk)
+        query = SimilarRequestSerializer(data={**request.query_params.dict(), 'ids': [pokemon.id]})
+        query.is_valid(raise_exception=True)
+        results = similarity.get_similarity_index().similar(
+            query.validated_data['ids'], query.validated_data['k'], query.validated_data['metric']
+        )
+        if not results:
+            raise NotFound()
+        return Response(results[0])
+
+    @action(detail=False, methods=['post'], url_path='similar', url_name='batch-similar')
+    def batch_similar(self, request):
+        """
+        Returns the nearest neighbours of every Pokemon in `ids` in one
+        request, followed by the ids that were not found.
+        """
+        query = SimilarRequestSerializer(data=request.data)
+        query.is_valid(raise_exception=True)
+        ids = query.validated_data['ids']
+        results = similarity.get_similarity_index().similar(
+            ids, query.validated_data['k'], query.validated_data['metric']
+        )
+        found = {result['id'] for result in results}
+        return Response({'results': results, 'missing': [pk for pk in ids if pk not in found]})
+
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def weaknesses(self, request):
+        """
+        Returns the weaknesses of every Pokemon, or of the Pokemon in `?ids=`,
+        from the matchup table computed once per data version.
+        """
+        ids = parse_id_list_param(request, 'ids')
+        table = typechart.get_matchup_table()
+        return Response({'results': table.weaknesses(ids)})
+
+class MoveViewSet(CachedResponseMixin, SparseFieldsetMixin, BatchGetMixin, viewsets.ModelViewSet):
     queryset = Move.objects.all()
     serializer_class = MoveSerializer
+    pagination_class = PokedexPagination
     
     # Configure filtering, searching, and ordering
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['type', 'category']
-    search_fields = ['name', 'description', 'type', 'category']
+    filterset_class = MoveFilterSet
+    # Descriptions are searched through the full-text index by text_search
+    search_fields = ['name', 'type', 'category']
     ordering_fields = ['id', 'name', 'power', 'accuracy']
     ordering = ['id']
+    text_search_limit = 20
+    text_search_max_limit = 100
+    
+    @action(detail=True, methods=['get'])
+    @cache_response
+    def pokemon(self, request, pk=None):
+        """
+        Returns a paginated list of the Pokemon that can learn the move with
+        the given ID, in the slim list representation.
+        """
+        # Look the move up by key alone: the query parameters belong to the
+        # nested list, not to the move
+        move = get_object_or_404(Move.objects.only('id'), pk=pk)
+        pokemon = Pokemon.objects.filter(
+            id__in=Pokemon.moves.through.objects.filter(move_id=move.id).values('pokemon_id')
+        ).only(*PokemonListSerializer.Meta.fields).order_by('id')
+
+        page = self.paginate_queryset(pokemon)
+        serializer = PokemonListSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='text-search')
+    @cache_response
+    def text_search(self, request):
+        """
+        Returns the moves whose description or effect contain every word of
+        `?q=`, most relevant first, each with its relevance `rank`.
+        """
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', self.text_search_limit))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        limit = min(max(limit, 1), self.text_search_max_limit)
+
+        ranked = search_moves(query, limit) if query else []
+        moves = self.get_queryset().in_bulk([pk for pk, _ in ranked])
+        ranked = [(moves[pk], rank) for pk, rank in ranked if pk in moves]
+
+        serializer = self.get_serializer([move for move, _ in ranked], many=True)
+        results = [dict(data, rank=rank) for data, (_, rank) in zip(serializer.data, ranked)]
+        return Response({'results': results})
+
+class SearchView(APIView):
+    """
+    Ranked fuzzy and prefix search over Pokemon and move names, e.g.
+    `/api/search/?q=charzard&type=pokemon&limit=5`.
+    """
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        kinds = [kind for kind in parse_list_param(request, 'type') if kind in SEARCH_KINDS]
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        limit = min(max(limit, 1), self.max_limit)
+
+        results = get_search_backend().search(query, kinds or SEARCH_KINDS, limit) if query else []
+        return Response({'results': results})
+
+class AutocompleteView(APIView):
+    """
+    Prefix completions for search boxes, e.g. `/api/autocomplete/?q=cha`.
+
+    Called on every keystroke, so it skips authentication and the browsable
+    API, returns a bare list of `{id, name, sprite}` objects and lets clients
+    and proxies cache each prefix.
+    """
+    authentication_classes = []
+    permission_classes = []
+    renderer_classes = [JSONRenderer]
+    default_limit = 8
+    max_limit = 20
+
+    def get(self, request):
+        kind = request.query_params.get('type', 'pokemon')
+        if kind not in SEARCH_KINDS:
+            raise ValidationError({'type': [f'Must be one of: {", ".join(SEARCH_KINDS)}.']})
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        limit = min(max(limit, 1), self.max_limit)
+
+        response = Response(autocomplete(request.query_params.get('q', ''), kind, limit))
+        patch_cache_control(
+            response, public=True,
+            max_age=getattr(settings, 'POKEDEX_AUTOCOMPLETE_MAX_AGE', 3600),
+        )
+        return response
+
+class DamageView(APIView):
+    """
+    Computes the damage of every move from every attacker to every defender
+    in one request.
+
+    Grids of up to `stream_threshold` cells are returned as a single JSON
+    object with a nested `damage[attacker][defender][move]` array. Larger
+    grids, or any grid with `?stream=true`, are streamed as newline-delimited
+    JSON: a header line followed by one line per attacker.
+    """
+    stream_threshold = 100_000
+
+    def post(self, request):
+        serializer = DamageRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        attackers, defenders, moves, missing = damage.load_grid(
+            data['attackers'], data['defenders'], data['moves']
+        )
+        errors = {key: [f'Unknown ids: {ids}'] for key, ids in missing.items() if ids}
+        if errors:
+            raise ValidationError(errors)
+
+        header = {
+            'attackers': attackers.ids,
+            'defenders': defenders.ids,
+            'moves': moves.ids,
+            'level': data['level'],
+            'expected': data['expected'],
+        }
+        cells = len(attackers) * len(defenders) * len(moves)
+        if cells > self.stream_threshold or request.query_params.get('stream') == 'true':
+            return StreamingHttpResponse(
+                self.stream(header, attackers, defenders, moves),
+                content_type='application/x-ndjson',
+            )
+
+        grid = damage.damage_grid(attackers, defenders, moves, data['level'], data['expected'])
+        return Response({**header, 'damage': self.to_list(grid, data['expected'])})
+
+    def to_list(self, grid, expected):
+        return np.round(grid, 2).tolist() if expected else grid.astype(np.int64).tolist()
+
+    def stream(self, header, attackers, defenders, moves):
+        yield json.dumps(header, separators=(',', ':')) + '\n'
+        chunks = damage.iter_damage_chunks(
+            attackers, defenders, moves, header['level'], header['expected']
+        )
+        for start, grid in chunks:
+            for offset, rows in enumerate(self.to_list(grid, header['expected'])):
+                line = {'attacker': attackers.ids[start + offset], 'damage': rows}
+                yield json.dumps(line, separators=(',', ':')) + '\n'
+
+class TeamView(APIView):
+    """
+    Searches for the teams whose moves and types cover the most types, see
+    teams.optimize() for the scoring and constraints.
+    """
+
+    def post(self, request):
+        serializer = TeamRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        index = teams.get_team_index()
+        errors = {}
+        for key in ('include', 'pool'):
+            missing = index.missing(data.get(key, []))
+            if missing:
+                errors[key] = [f'Unknown ids: {missing}']
+        if errors:
+            raise ValidationError(errors)
+
+        return Response(teams.optimize(**data))
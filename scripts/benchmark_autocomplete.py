@@ -0,0 +1,91 @@
+"""
+Benchmark the autocomplete endpoint under simulated keystroke traffic.
+
+Every Pokemon (or move) name in the database is typed one character at a
+time, issuing one /api/autocomplete/ request per keystroke, and the latency
+percentiles are reported for the whole request and for the index lookup on
+its own. Load the data first with load_data.py.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import django
+
+# Add the parent directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pokedex.settings")
+django.setup()
+
+from django.test import Client
+
+from pokemon.models import Move, Pokemon
+from pokemon.search import autocomplete
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def report(label, samples):
+    ms = [sample * 1000 for sample in samples]
+    print(
+        f"{label}: {len(ms)} samples, "
+        f"p50 {percentile(ms, 0.50):.3f}ms, p95 {percentile(ms, 0.95):.3f}ms, "
+        f"p99 {percentile(ms, 0.99):.3f}ms, max {max(ms):.3f}ms"
+    )
+
+def keystrokes(names, rounds, seed):
+    """Yield every prefix of every name, with the names in random order"""
+    rng = random.Random(seed)
+    for _ in range(rounds):
+        names = list(names)
+        rng.shuffle(names)
+        for name in names:
+            for i in range(1, len(name) + 1):
+                yield name[:i].lower()
+
+def run(kind="pokemon", rounds=1, limit=8, seed=0):
+    model = Pokemon if kind == "pokemon" else Move
+    names = list(model.objects.values_list("name", flat=True))
+    if not names:
+        sys.exit("No data to search, run scripts/load_data.py first.")
+
+    # Build the index outside the measurements
+    autocomplete("a", kind, limit)
+
+    lookups = []
+    for query in keystrokes(names, rounds, seed):
+        start = time.perf_counter()
+        autocomplete(query, kind, limit)
+        lookups.append(time.perf_counter() - start)
+    report("Index lookups", lookups)
+
+    client = Client(SERVER_NAME="localhost")
+    requests = []
+    for query in keystrokes(names, rounds, seed):
+        start = time.perf_counter()
+        response = client.get("/api/autocomplete/", {"q": query, "type": kind, "limit": limit})
+        requests.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            sys.exit(f"Request for {query!r} failed with {response.status_code}")
+    report("Full requests", requests)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark /api/autocomplete/ latency.")
+    parser.add_argument("--type", choices=["pokemon", "move"], default="pokemon",
+                        help="Names to complete (default: pokemon)")
+    parser.add_argument("--rounds", type=int, default=1,
+                        help="How many times to type every name (default: 1)")
+    parser.add_argument("--limit", type=int, default=8, help="Results per request (default: 8)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the typing order")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.type, args.rounds, args.limit, args.seed)
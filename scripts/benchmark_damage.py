@@ -0,0 +1,95 @@
+"""
+Benchmark the batched damage calculator in grid cells per second.
+
+Synthetic attackers, defenders and moves with random stats and types are
+generated in memory, so no data needs to be loaded. Both the in-memory grid
+computation and the newline-delimited JSON encoding used for streamed
+responses are measured.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import django
+import numpy as np
+
+# Add the parent directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pokedex.settings")
+django.setup()
+
+from pokemon.damage import Combatants, MoveSet, damage_grid
+from pokemon.typechart import NO_TYPE, TYPES
+from pokemon.views import DamageView
+
+def synthetic_pokemon(count, rng):
+    type_1 = rng.integers(0, len(TYPES), count)
+    type_2 = rng.integers(0, len(TYPES) + 1, count)
+    type_2[type_2 == type_1] = NO_TYPE
+    stats = {
+        field: rng.integers(5, 200, count).astype(np.float64)
+        for field in ("attack", "defense", "sp_atk", "sp_def")
+    }
+    return Combatants(list(range(count)), type_1=type_1, type_2=type_2, **stats)
+
+def synthetic_moves(count, rng):
+    categories = rng.choice(["physical", "special", "status"], count, p=[0.45, 0.45, 0.1])
+    return MoveSet(
+        {
+            "id": i,
+            "type": TYPES[rng.integers(0, len(TYPES))],
+            "power": int(rng.integers(20, 150)),
+            "category": str(categories[i]),
+            "accuracy": int(rng.integers(50, 101)),
+        }
+        for i in range(count)
+    )
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def run(attackers=500, defenders=500, moves=40, repeat=3, seed=0):
+    rng = np.random.default_rng(seed)
+    attacking = synthetic_pokemon(attackers, rng)
+    defending = synthetic_pokemon(defenders, rng)
+    move_set = synthetic_moves(moves, rng)
+    cells = attackers * defenders * moves
+    print(f"Grid: {attackers} attackers x {defenders} defenders x {moves} moves = {cells:,} cells")
+
+    best = min(
+        timed(lambda: damage_grid(attacking, defending, move_set)) for _ in range(repeat)
+    )
+    print(f"Grid computation: {best:.3f}s, {cells / best:,.0f} cells/s")
+
+    view = DamageView()
+    header = {"attackers": attacking.ids, "defenders": defending.ids, "moves": move_set.ids,
+              "level": 50, "expected": False}
+
+    def stream():
+        return sum(len(line) for line in view.stream(header, attacking, defending, move_set))
+
+    start = time.perf_counter()
+    size = stream()
+    elapsed = time.perf_counter() - start
+    print(f"Streamed NDJSON: {elapsed:.3f}s, {cells / elapsed:,.0f} cells/s, {size / 1e6:.1f} MB")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the damage calculator.")
+    parser.add_argument("--attackers", type=int, default=500, help="Attackers in the grid (default: 500)")
+    parser.add_argument("--defenders", type=int, default=500, help="Defenders in the grid (default: 500)")
+    parser.add_argument("--moves", type=int, default=40, help="Moves in the grid (default: 40)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Grid computations to time, keeping the fastest (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.attackers, args.defenders, args.moves, args.repeat, args.seed)
@@ -0,0 +1,63 @@
+"""
+Benchmark learnset bitmap queries on synthetic learnsets.
+
+Random learnsets are generated in memory, so no data needs to be loaded.
+Reports the size of the bitmaps and the time to match every Pokemon against
+queries for all, any or none of a growing number of moves.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import django
+import numpy as np
+
+# Add the parent directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pokedex.settings")
+django.setup()
+
+from pokemon.learnsets import LearnsetBitmaps
+
+def synthetic_learnsets(pokemon, moves, learnset_size, rng):
+    return [
+        (pokemon_id, move_id)
+        for pokemon_id in range(pokemon)
+        for move_id in rng.choice(moves, learnset_size, replace=False).tolist()
+    ]
+
+def run(pokemon=100_000, moves=1000, learnset_size=60, repeat=20, seed=0):
+    rng = np.random.default_rng(seed)
+    learnsets = synthetic_learnsets(pokemon, moves, learnset_size, rng)
+    start = time.perf_counter()
+    bitmaps = LearnsetBitmaps(learnsets, range(pokemon), range(moves))
+    print(f"Built bitmaps for {pokemon:,} Pokemon x {moves:,} moves in "
+          f"{time.perf_counter() - start:.2f}s, {bitmaps.nbytes / 1e6:.1f} MB")
+
+    for count in (1, 2, 4, 8):
+        move_ids = rng.choice(moves, count, replace=False).tolist()
+        for name in ("all_of", "any_of", "none_of"):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                matched = bitmaps.match(**{name: move_ids})
+            elapsed = (time.perf_counter() - start) / repeat
+            print(f"{count} move(s), {name}: {elapsed * 1000:.2f}ms, {int(matched.sum()):,} matches")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark learnset bitmap queries.")
+    parser.add_argument("--pokemon", type=int, default=100_000, help="Synthetic Pokemon (default: 100,000)")
+    parser.add_argument("--moves", type=int, default=1000, help="Synthetic moves (default: 1000)")
+    parser.add_argument("--learnset-size", type=int, default=60,
+                        help="Moves learned by each Pokemon (default: 60)")
+    parser.add_argument("--repeat", type=int, default=20, help="Times each query is run (default: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.pokemon, args.moves, args.learnset_size, args.repeat, args.seed)
@@ -0,0 +1,76 @@
+"""
+Benchmark the Pokemon similarity index on synthetic data.
+
+Builds a SimilarityIndex over random stat spreads and types (1,000,000 rows
+by default), then reports its memory footprint, the latency percentiles of
+single top-k queries and the throughput of batched queries, for both
+metrics.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import django
+import numpy as np
+
+# Add the parent directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pokedex.settings")
+django.setup()
+
+from pokemon.similarity import METRICS, SimilarityIndex
+from pokemon.typechart import NO_TYPE, TYPES
+
+def synthetic_index(rows, rng):
+    stats = rng.integers(5, 200, (rows, 6))
+    type_1 = rng.integers(0, len(TYPES), rows)
+    type_2 = rng.integers(0, len(TYPES) + 1, rows)
+    type_2[type_2 == type_1] = NO_TYPE
+    return SimilarityIndex(np.arange(1, rows + 1), stats, type_1, type_2)
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def run(rows=1_000_000, queries=200, batch=64, k=10, seed=0):
+    rng = np.random.default_rng(seed)
+
+    start = time.perf_counter()
+    index = synthetic_index(rows, rng)
+    print(f"Built index over {rows:,} rows in {time.perf_counter() - start:.2f}s, "
+          f"{index.nbytes / 1e6:.1f} MB ({index.matrix.nbytes / 1e6:.1f} MB feature matrix)")
+
+    positions = rng.integers(0, rows, queries)
+    batch_positions = rng.integers(0, rows, batch)
+    for metric in METRICS:
+        samples = []
+        for position in positions:
+            start = time.perf_counter()
+            index.neighbors([position], k, metric)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{metric}: single queries p50 {percentile(samples, 0.50):.2f}ms, "
+              f"p99 {percentile(samples, 0.99):.2f}ms")
+
+        start = time.perf_counter()
+        index.neighbors(batch_positions, k, metric)
+        elapsed = time.perf_counter() - start
+        print(f"{metric}: batch of {batch} in {elapsed * 1000:.1f}ms, "
+              f"{batch / elapsed:,.0f} queries/s")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Pokemon similarity index.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic Pokemon (default: 1,000,000)")
+    parser.add_argument("--queries", type=int, default=200, help="Single queries to time (default: 200)")
+    parser.add_argument("--batch", type=int, default=64, help="Queries in the batched query (default: 64)")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query (default: 10)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.rows, args.queries, args.batch, args.k, args.seed)
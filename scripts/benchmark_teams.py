@@ -0,0 +1,75 @@
+"""
+Benchmark the team optimizer on synthetic candidate pools.
+
+Synthetic Pokemon with random types, base stat totals and learnsets are
+turned into coverage masks in memory, so no data needs to be loaded. Reports
+how many candidates survive pruning and how long the beam search takes in
+one process and fanned out across worker processes.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import django
+import numpy as np
+
+# Add the parent directory to sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pokedex.settings")
+django.setup()
+
+from django.test import override_settings
+
+from pokemon.teams import TeamIndex, search
+from pokemon.teamsearch import TOTAL_SCALE, prune_pool
+from pokemon.typechart import TYPES
+
+def synthetic_index(count, moves, rng):
+    type_1 = rng.integers(0, len(TYPES), count)
+    type_2 = rng.integers(0, len(TYPES) + 1, count)
+    rows = [
+        (i, f"Pokemon {i}", TYPES[first], TYPES[second] if second < len(TYPES) else None,
+         int(rng.integers(200, 700)))
+        for i, (first, second) in enumerate(zip(type_1.tolist(), type_2.tolist()))
+    ]
+    learnsets = [
+        (i, TYPES[move_type])
+        for i in range(count)
+        for move_type in rng.integers(0, len(TYPES), moves).tolist()
+    ]
+    return TeamIndex(rows, learnsets)
+
+def run(pool=20_000, moves=4, beam_width=64, workers=4, seed=0):
+    rng = np.random.default_rng(seed)
+    index = synthetic_index(pool, moves, rng)
+
+    start = time.perf_counter()
+    kept = prune_pool(index.masks, index.totals, 6)
+    print(f"Pruned {pool:,} candidates to {len(kept):,} in {time.perf_counter() - start:.3f}s")
+    masks, totals = index.masks[kept], index.totals[kept]
+
+    for processes in sorted({1, workers}):
+        with override_settings(POKEDEX_TEAM_PARALLEL_POOL=1, POKEDEX_TEAM_WORKERS=processes):
+            start = time.perf_counter()
+            _, scores, _ = search(masks, totals, 6, 0, 0, beam_width, 5, None)
+            elapsed = time.perf_counter() - start
+        print(f"{processes} process(es): {elapsed:.3f}s, best coverage {scores[0] // TOTAL_SCALE}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the team optimizer.")
+    parser.add_argument("--pool", type=int, default=20_000, help="Synthetic candidates (default: 20,000)")
+    parser.add_argument("--moves", type=int, default=4,
+                        help="Damaging move types learned by each candidate (default: 4)")
+    parser.add_argument("--beam-width", type=int, default=64, help="Beam width (default: 64)")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes to compare (default: 4)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.pool, args.moves, args.beam_width, args.workers, args.seed)
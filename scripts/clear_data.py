@@ -17,6 +17,10 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pokedex.settings")
 django.setup()
 
 # Import models after Django setup
+from django.db import transaction
+
+from pokemon.cache import bump_data_version
+from pokemon.loaders import clear_tables
 from pokemon.models import Pokemon, Move
 
 def clear_data():
@@ -27,24 +31,14 @@ def clear_data():
     
     print(f"Found {pokemon_count} Pokemon and {move_count} Moves in the database.")
     
-    # Delete all Pokemon objects
-    # This will also remove the many-to-many relationships
-    Pokemon.objects.all().delete()
-    
-    # Delete all Move objects
-    Move.objects.all().delete()
-    
-    # Verify deletion
-    remaining_pokemon = Pokemon.objects.count()
-    remaining_moves = Move.objects.count()
+    # Empty the Pokemon, Move and learnset tables in bulk instead of
+    # collecting and deleting every object in Python
+    with transaction.atomic():
+        clear_tables()
+        transaction.on_commit(bump_data_version)
     
     print(f"Deleted {pokemon_count} Pokemon and {move_count} Moves.")
-    print(f"Remaining: {remaining_pokemon} Pokemon and {remaining_moves} Moves.")
-    
-    if remaining_pokemon == 0 and remaining_moves == 0:
-        print("Database successfully cleared!")
-    else:
-        print("WARNING: Some objects were not deleted!")
+    print("Database successfully cleared!")
 
 if __name__ == "__main__":
     # Check for command line arguments
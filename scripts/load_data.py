@@ -4,11 +4,17 @@ This script will:
 1. Load all moves from moves.csv
 2. Load all Pokemon from pokemon.csv
 3. Assign moves to Pokemon based on the pokemon_moves dictionary
+
+CSV rows are streamed and written in batches, and the whole load runs in a
+single transaction. Run with --help to load other files or read from stdin.
 """
 
+import argparse
 import os
 import django
 import sys
+import time
+from contextlib import contextmanager
 
 # Add the parent directory to sys.path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -18,68 +24,84 @@ sys.path.append(parent_dir)
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pokedex.settings")
 django.setup()
 
-from pokemon.models import Pokemon, Move
+from django.db import transaction
+
+from pokemon import loaders
+from pokemon.cache import bump_data_version
+from pokemon.parsers import (
+    DEFAULT_BATCH_SIZE, DEFAULT_MOVES_CSV, DEFAULT_POKEMON_CSV, RowErrors,
+    read_moves_batches, read_pokemon_batches,
+)
 from pokemon_data import pokemon_moves
-from csv_loader import load_pokemon_from_csv, load_moves_from_csv
-
-def load_moves():
-    """Load all moves from moves.csv"""
-    moves_data = load_moves_from_csv()
-    for data in moves_data:
-        Move.objects.get_or_create(name=data["name"], defaults=data)
-    print(f"Loaded {len(moves_data)} moves successfully!")
-
-def load_pokemon():
-    """Load all Pokemon from pokemon.csv"""
-    # Get Pokemon data from CSV file
-    pokemon_data = load_pokemon_from_csv()
-    
-    for data in pokemon_data:
-        pokemon, created = Pokemon.objects.get_or_create(name=data["name"], defaults=data)
-        
-        # Update existing Pokemon with current data
-        if not created:
-            for key, value in data.items():
-                setattr(pokemon, key, value)
-            pokemon.save()
-    
-    print(f"Loaded {len(pokemon_data)} Pokemon successfully!")
-
-def assign_moves():
+
+@contextmanager
+def timed(label):
+    """Print how long the wrapped phase took"""
+    start = time.perf_counter()
+    yield
+    print(f"{label} took {time.perf_counter() - start:.2f}s")
+
+def load_moves(source=DEFAULT_MOVES_CSV, batch_size=DEFAULT_BATCH_SIZE, errors=None):
+    """Load all moves from a moves CSV, creating the ones that don't exist yet"""
+    total, created = loaders.load_moves(read_moves_batches(source, batch_size, errors), errors)
+    print(f"Loaded {total} moves successfully! ({created} new)")
+
+def load_pokemon(source=DEFAULT_POKEMON_CSV, batch_size=DEFAULT_BATCH_SIZE, errors=None):
+    """Load all Pokemon from a Pokemon CSV, updating the ones that already exist"""
+    total, updated = loaders.load_pokemon(read_pokemon_batches(source, batch_size, errors), errors)
+    print(f"Loaded {total} Pokemon successfully! ({total - updated} new, {updated} updated)")
+
+def assign_moves(learnsets=None):
     """Assign moves to Pokemon based on the pokemon_moves dictionary"""
-    for pokemon_name, move_names in pokemon_moves.items():
-        try:
-            pokemon = Pokemon.objects.get(name=pokemon_name)
-            
-            # Clear existing moves to avoid duplicates
-            pokemon.moves.clear()
-            
-            # Assign moves to the Pokemon
-            for move_name in move_names:
-                try:
-                    move = Move.objects.get(name=move_name)
-                    pokemon.moves.add(move)
-                except Move.DoesNotExist:
-                    print(f"Move {move_name} not found")
-        except Pokemon.DoesNotExist:
-            print(f"Pokemon {pokemon_name} not found")
-    
-    print("Assigned moves to Pokemon successfully!")
-
-def load_all_data():
+    if learnsets is None:
+        learnsets = pokemon_moves
+    rows, pokemon_count, missing_pokemon, missing_moves = loaders.assign_moves(learnsets)
+
+    for pokemon_name in missing_pokemon:
+        print(f"Pokemon {pokemon_name} not found")
+    for move_name in missing_moves:
+        print(f"Move {move_name} not found")
+    print(f"Assigned {rows} moves to {pokemon_count} Pokemon successfully!")
+
+def load_all_data(pokemon_source=DEFAULT_POKEMON_CSV, moves_source=DEFAULT_MOVES_CSV,
+                  batch_size=DEFAULT_BATCH_SIZE):
     """Load all data in the correct order"""
     print("Starting data loading process...")
-    
-    # First load moves (since Pokemon reference moves)
-    load_moves()
-    
-    # Then load Pokemon
-    load_pokemon()
-    
-    # Finally assign moves to Pokemon
-    assign_moves()
-    
+    errors = RowErrors(sys.stderr)
+
+    with timed("Data loading"), transaction.atomic():
+        # First load moves (since Pokemon reference moves)
+        with timed("Loading moves"):
+            load_moves(moves_source, batch_size, errors)
+
+        # Then load Pokemon
+        with timed("Loading Pokemon"):
+            load_pokemon(pokemon_source, batch_size, errors)
+
+        # Finally assign moves to Pokemon
+        with timed("Assigning moves"):
+            assign_moves()
+
+        # Bulk writes skip model signals, so invalidate cached responses here
+        transaction.on_commit(bump_data_version)
+
+    if errors:
+        print(f"Skipped {len(errors)} invalid rows.", file=sys.stderr)
     print("Data loading complete!")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load Pokemon and moves into the database.")
+    parser.add_argument("--pokemon", default=DEFAULT_POKEMON_CSV,
+                        help='Pokemon CSV file, or "-" for stdin (default: scripts/pokemon.csv)')
+    parser.add_argument("--moves", default=DEFAULT_MOVES_CSV,
+                        help='Moves CSV file, or "-" for stdin (default: scripts/moves.csv)')
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows written per batch (default: {DEFAULT_BATCH_SIZE})")
+    args = parser.parse_args(argv)
+    if args.pokemon == "-" and args.moves == "-":
+        parser.error("only one of --pokemon and --moves can read from stdin")
+    return args
+
 if __name__ == "__main__":
-    load_all_data()
\ No newline at end of file
+    args = parse_args()
+    load_all_data(args.pokemon, args.moves, args.batch_size)